@@ -0,0 +1,87 @@
+"""Benchmark "load one race" and "load one season" on the combined file vs the partitioned dataset.
+
+Builds a synthetic lap chart history in a temporary local bucket: one source per race,
+30 cars x 250 laps, 17 races per season. The script writes both output layouts from it
+with concat_prefix_streaming and write_partitioned_dataset, checks that both layouts
+return the same rows for each query and prints the timings.
+
+Run from the repo root:
+    python -m benchmarks.bench_dataset_reads [seasons]
+"""
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from indycar_analytics.util.storage import LocalStorage
+from indycar_analytics.util.concat_gcs_parquets import concat_prefix_streaming
+from indycar_analytics.util.datasets import write_partitioned_dataset, read_dataset
+
+RACES_PER_SEASON = 17
+CARS = 30
+LAPS = 250
+SOURCE_PREFIX = 'lapcharts/Race/'
+COMBINED = 'lapcharts/combined_lapcharts_Race.pq'
+DATASET = 'lapcharts/dataset'
+
+
+def build_sources(storage, seasons, seed=0):
+    rng = np.random.default_rng(seed)
+    for season in range(2024 - seasons + 1, 2025):
+        for race in range(RACES_PER_SEASON):
+            file = f'{season}0{race % 9 + 1}15;{season}{race:02d};Race_{race:02d};RACE;lapchart.pq'
+            df = pd.DataFrame({
+                'Lap': np.repeat(np.arange(1, LAPS + 1), CARS),
+                'Position': np.tile(np.arange(1, CARS + 1), LAPS),
+                'Car': rng.integers(2, 99, CARS * LAPS).astype(str),
+                'Fill': rng.choice(['', 'pit', 'caution'], CARS * LAPS),
+            })
+            df['file'] = file.replace('.pq', '.pdf')
+            storage.write(SOURCE_PREFIX + file, df.to_parquet(index=False))
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def same_rows(a, b):
+    cols = list(a.columns)
+    a = a.sort_values(cols).reset_index(drop=True)
+    b = b[cols].sort_values(cols).reset_index(drop=True)
+    return a.astype(str).equals(b.astype(str))
+
+
+def main(seasons=10):
+    with tempfile.TemporaryDirectory() as root:
+        storage = LocalStorage(root)
+        build_sources(storage, seasons)
+        concat_prefix_streaming(SOURCE_PREFIX, COMBINED, storage=storage)
+        write_partitioned_dataset(SOURCE_PREFIX, DATASET, 2, storage=storage)
+
+        race_file = '20230515;202304;Race_04;RACE;lapchart.pdf'
+        queries = {
+            'one race': (
+                lambda df: df[df.file == race_file],
+                [('season', '=', 2023), ('race', '=', 'Race 04')],
+            ),
+            'one season': (
+                lambda df: df[df.file.str.startswith('2023')],
+                [('season', '=', 2023)],
+            ),
+        }
+        for label, (combined_filter, filters) in queries.items():
+            combined, combined_time = timed(
+                lambda: combined_filter(pd.read_parquet(storage.uri(COMBINED))))
+            dataset, dataset_time = timed(
+                lambda: read_dataset(DATASET, filters=filters, storage=storage))
+            dataset = dataset[list(combined.columns)]
+            if not same_rows(combined, dataset):
+                raise AssertionError(f'{label}: combined file and dataset disagree')
+            print(f'{label:<11} rows={len(dataset):<8} combined {combined_time:.3f}s  '
+                  f'dataset {dataset_time:.3f}s  speedup {combined_time / dataset_time:.1f}x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
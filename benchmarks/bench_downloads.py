@@ -0,0 +1,197 @@
+"""Benchmark DownloadQueue against one-at-a-time requests.get on a local stand-in server.
+
+Serves synthetic report PDFs from a local HTTP server that adds a fixed latency to each
+response, like the results site's CDN. The same files are downloaded serially with a
+bare requests.get per file (the scraper's old behaviour) and then through a
+DownloadQueue. The script checks both copies byte for byte and prints the timings.
+
+It then checks resume: the server cuts the first response for every file off halfway,
+and a leftover .part file stands in for a killed crawl. The queue has to finish each
+file with Range requests; the leftover file must only fetch its missing bytes.
+
+Last it checks revalidation: after one report is revised on the server, a revalidating
+queue with a DownloadManifest must transfer and report only that file.
+
+Run from the repo root:
+    python -m benchmarks.bench_downloads [files] [latency_ms]
+"""
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import requests
+from indycar_analytics.scraper.downloads import DownloadQueue
+from indycar_analytics.scraper.download_manifest import DownloadManifest
+
+FILE_SIZE = 200_000
+
+
+def make_files(n, seed=0):
+    rng = random.Random(seed)
+    return {f'/{i}/report.pdf': b'%PDF-1.4\n' + rng.randbytes(FILE_SIZE) for i in range(n)}
+
+
+def make_handler(files, latency, cut=None, sent=None):
+    """cut: paths whose next response is dropped halfway; sent: (path, body bytes) per response."""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            time.sleep(latency)
+            body = files.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            start = 0
+            rng = self.headers.get('Range')
+            if rng:
+                start = int(rng.split('=')[1].split('-')[0])
+                if start >= len(body):
+                    self.send_response(416)
+                    self.send_header('Content-Range', f'bytes */{len(body)}')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}')
+            else:
+                self.send_response(200)
+            self.send_header('Content-Type', 'application/pdf')
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body) - start))
+            self.end_headers()
+
+            payload = body[start:]
+            if cut is not None and self.path in cut:
+                cut.discard(self.path)
+                payload = payload[:len(payload) // 2]
+                self.close_connection = True
+            if sent is not None:
+                sent.append((self.path, len(payload)))
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def serve(files, latency, cut=None, sent=None):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(files, latency, cut, sent))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def check(files, out_dir):
+    for path, body in files.items():
+        with open(os.path.join(out_dir, path.strip('/').replace('/', '_')), 'rb') as f:
+            if f.read() != body:
+                raise AssertionError(f'{path} downloaded incorrectly')
+
+
+def check_resume(files):
+    """Every transfer is interrupted once; the queue must still end with exact copies."""
+    cut, sent = set(files), []
+    server = serve(files, 0, cut, sent)
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    with tempfile.TemporaryDirectory() as tmp:
+        # a killed crawl left the first file half written
+        first = next(iter(files))
+        with open(os.path.join(tmp, first.strip('/').replace('/', '_')) + '.part', 'wb') as f:
+            f.write(files[first][:FILE_SIZE // 2])
+        cut.discard(first)
+
+        with DownloadQueue(backoff=0) as downloads:
+            for path in files:
+                downloads.submit(base + path, os.path.join(tmp, path.strip('/').replace('/', '_')))
+        check(files, tmp)
+        if any(name.endswith('.part') for name in os.listdir(tmp)):
+            raise AssertionError('partial files left behind')
+    server.shutdown()
+
+    # a dropped connection may lose the chunk in flight, a .part left on disk loses nothing
+    resumed = sum(n for path, n in sent if path == first)
+    if resumed != len(files[first]) - FILE_SIZE // 2:
+        raise AssertionError(f'resume re-fetched bytes: sent {resumed} for the second half of {first}')
+    total = sum(len(body) for body in files.values())
+    print(f'resume: {len(files)} interrupted files completed, {sum(n for _, n in sent)} bytes sent for {total}')
+
+
+def check_revalidate(files):
+    """Only the report revised on the server is transferred again."""
+    sent = []
+    server = serve(files, 0, sent=sent)
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = DownloadManifest(os.path.join(tmp, 'downloads.sqlite'))
+        local = {path: os.path.join(tmp, path.strip('/').replace('/', '_')) for path in files}
+        with DownloadQueue(backoff=0, manifest=manifest) as downloads:
+            for path in files:
+                downloads.submit(base + path, local[path])
+
+        revised = next(iter(files))
+        files[revised] = files[revised] + b'%revised'
+        sent.clear()
+        downloads = DownloadQueue(backoff=0, manifest=manifest, revalidate=True)
+        for path in files:
+            downloads.submit(base + path, local[path])
+        changed, failed = downloads.close()
+        manifest.close()
+
+        check(files, tmp)
+        if failed or changed != [local[revised]] or downloads.revised != [local[revised]]:
+            raise AssertionError(f'revalidation reported {changed}, failed {failed}')
+        if [n for _, n in sent if n] != [len(files[revised])]:
+            raise AssertionError(f'revalidation transferred {sent}')
+    server.shutdown()
+    print(f'revalidate: {len(files)} files checked, 1 revised file transferred')
+
+
+def main(n=40, latency_ms=100):
+    files = make_files(n)
+    server = serve(files, latency_ms / 1000)
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        serial_dir, queue_dir = os.path.join(tmp, 'serial'), os.path.join(tmp, 'queue')
+        os.makedirs(serial_dir)
+
+        start = time.perf_counter()
+        for path in files:
+            r = requests.get(base + path)
+            r.raise_for_status()
+            with open(os.path.join(serial_dir, path.strip('/').replace('/', '_')), 'wb') as f:
+                f.write(r.content)
+        serial_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with DownloadQueue() as downloads:
+            for path in files:
+                downloads.submit(base + path, os.path.join(queue_dir, path.strip('/').replace('/', '_')))
+        queue_time = time.perf_counter() - start
+
+        check(files, serial_dir)
+        check(files, queue_dir)
+
+    server.shutdown()
+    print(f'{n} files, {latency_ms}ms latency')
+    print(f'serial requests.get: {serial_time:.2f}s')
+    print(f'DownloadQueue:       {queue_time:.2f}s')
+    print(f'speedup:             {serial_time / queue_time:.1f}x')
+    check_resume(make_files(min(n, 8), seed=1))
+    check_revalidate(make_files(min(n, 8), seed=2))
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
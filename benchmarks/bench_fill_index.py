@@ -0,0 +1,66 @@
+"""Benchmark FillIndex against the linear find_fill scan on a synthetic lap chart.
+
+Builds the fills and digit-token boxes for a 30-car, 250-lap chart (one token per
+car per lap plus the lap header row), checks that both lookups agree on every token
+and prints the timings.
+
+Run from the repo root:
+    python -m benchmarks.bench_fill_index
+"""
+import random
+import time
+import fitz
+from indycar_analytics.util.pdf_utils import FillIndex, find_fill
+
+CARS = 30
+LAPS = 250
+CELL_W, CELL_H = 14.0, 10.0
+FILLS = [(65, 105, 224), (146, 111, 219), (210, 210, 210)]
+
+
+def build_chart(seed=0):
+    rng = random.Random(seed)
+    filled_rects, tokens = [], []
+
+    # row 0 is the lap header, rows 1..CARS are positions
+    for row in range(CARS + 1):
+        y0 = 60 + row * CELL_H
+        for lap in range(LAPS):
+            x0 = 20 + lap * CELL_W
+            cell = fitz.Rect(x0, y0, x0 + CELL_W, y0 + CELL_H)
+            if rng.random() < 0.4:
+                filled_rects.append({'rect': cell, 'fill': rng.choice(FILLS)})
+            tokens.append({'bbox': (x0 + 2, y0 + 1.5, x0 + CELL_W - 2, y0 + CELL_H - 1.5)})
+
+    # a couple of full-width rules like the ones drawn between position groups
+    for row in range(0, CARS + 1, 10):
+        y = 60 + row * CELL_H
+        filled_rects.append({'rect': fitz.Rect(20, y - 0.5, 20 + LAPS * CELL_W, y), 'fill': (0, 0, 0)})
+
+    return filled_rects, tokens
+
+
+def main():
+    filled_rects, tokens = build_chart()
+    print(f'{len(tokens)} tokens, {len(filled_rects)} filled rects')
+
+    start = time.perf_counter()
+    linear = [find_fill(t, filled_rects) for t in tokens]
+    linear_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = FillIndex(filled_rects)
+    indexed = [find_fill(t, index) for t in tokens]
+    indexed_time = time.perf_counter() - start
+
+    if linear != indexed:
+        mismatches = sum(a != b for a, b in zip(linear, indexed))
+        raise AssertionError(f'FillIndex disagrees with linear scan on {mismatches} tokens')
+
+    print(f'linear scan: {linear_time:.3f}s')
+    print(f'FillIndex:   {indexed_time:.3f}s (including index build)')
+    print(f'speedup:     {linear_time / indexed_time:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Benchmark the numpy vs python engines of clean_section_results_page on one PDF.
+
+Parses the PDF once, cleans every page with each engine, checks the outputs are
+identical and prints the timings. The pages of each run share one SectionLayout, as in
+parse_section_results_file, and its header cache hits and misses are printed.
+
+Run from the repo root:
+    python -m benchmarks.bench_section_cleaning data/pdfs/sectionresults/<file>.pdf
+"""
+import sys
+import time
+import fitz
+import pandas as pd
+from indycar_analytics.util.pdf_utils import parse_file, iter_pages
+from indycar_analytics.section_results.cleaning import (
+    clean_section_results_page,
+    parse_sections_table,
+    SectionLayout,
+    classify_section_page,
+)
+
+
+def clean_all(df, st, engine, layout):
+    pages = [clean_section_results_page(dfp, st, engine=engine, layout=layout) for _, dfp in iter_pages(df)]
+    pages = [p for p in pages if not p.empty]
+    return pd.concat(pages).reset_index(drop=True) if pages else pd.DataFrame()
+
+
+def main(path, repeat=3):
+    with fitz.open(path) as doc:
+        df = parse_file(doc, columnar=True, page_filter=classify_section_page)
+    st = parse_sections_table(df)
+    print(f'{path}: {df.page.nunique()} pages, {len(df)} spans')
+
+    results, timings = {}, {}
+    for engine in ('python', 'numpy'):
+        best = float('inf')
+        for _ in range(repeat):
+            layout = SectionLayout(st)
+            start = time.perf_counter()
+            results[engine] = clean_all(df, st, engine, layout)
+            best = min(best, time.perf_counter() - start)
+        timings[engine] = best
+        print(f'{engine:>7}: {best:.3f}s ({len(results[engine])} rows, '
+              f'header cache {layout.hits} hits / {layout.misses} misses)')
+
+    if not results['numpy'].equals(results['python']):
+        raise AssertionError('numpy and python engines produced different output')
+    print(f'identical output, speedup {timings["python"] / timings["numpy"]:.1f}x')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
@@ -0,0 +1,67 @@
+"""Check the import-time budget of every entry point with `python -X importtime`.
+
+Each module is imported in a fresh interpreter. The check fails if the module's
+cumulative import time is over budget, or if it pulls in a heavy dependency that
+should only load when parsing/scraping actually runs. Exits non-zero on failure.
+
+Run from the repo root:
+    python -m benchmarks.check_import_times [budget_ms]
+"""
+import subprocess
+import sys
+
+ENTRY_POINTS = [
+    'indycar_analytics.results.main',
+    'indycar_analytics.html_results.main',
+    'indycar_analytics.lap_charts.main',
+    'indycar_analytics.section_results.main',
+    'indycar_analytics.util.concat_gcs_parquets',
+    'indycar_analytics.scraper.naming',
+]
+
+HEAVY_MODULES = ['pandas', 'numpy', 'fitz', 'pymupdf', 'camelot', 'selenium', 'google.cloud', 'pyarrow']
+
+DEFAULT_BUDGET_MS = 100
+
+
+def import_times(module):
+    """{imported module: cumulative microseconds} from -X importtime for a fresh import of module."""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f'import {module} failed:\n{proc.stderr}')
+
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main(budget_ms=DEFAULT_BUDGET_MS):
+    failures = []
+    for module in ENTRY_POINTS:
+        times = import_times(module)
+        total_ms = times.get(module, 0) / 1000
+        heavy = sorted({h for h in HEAVY_MODULES for name in times
+                        if name == h or name.startswith(h + '.')})
+
+        status = 'ok'
+        if total_ms > budget_ms:
+            status = f'over budget ({budget_ms}ms)'
+        if heavy:
+            status = f'imports {", ".join(heavy)}'
+        if status != 'ok':
+            failures.append(module)
+        print(f'{module:<45} {total_ms:8.1f}ms  {status}')
+
+    if failures:
+        sys.exit(f'{len(failures)} entry point(s) failed the import budget')
+
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS)
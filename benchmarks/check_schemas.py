@@ -0,0 +1,80 @@
+"""Round-trip checks for util.schemas: parsed frames keep their values through Parquet.
+
+Covers the lap chart fill formats: find_fill's "r,g,b" strings, (r, g, b) tuples, and
+older outputs holding either, which conform_table has to turn into the same '#rrggbb'.
+Also checks that results' whole-number columns are written as integers, not float64,
+including ones with blanks that pandas holds as floats.
+Exits non-zero on failure.
+
+Run from the repo root:
+    python -m benchmarks.check_schemas
+"""
+import io
+import sys
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from indycar_analytics.util.schemas import to_parquet_bytes, registered_schema
+from indycar_analytics.util.concat_gcs_parquets import conform_table
+
+EXPECTED = ['#ff0000', '#00ff80', None]
+
+
+def lap_chart_frame(fills):
+    return pd.DataFrame({
+        'Position': [1, 2, 3],
+        'Car': ['5', '10', '27'],
+        'Color': fills,
+        'lap': [1, 1, 1],
+        'lap_fill': fills,
+        'file': ['chart.pdf'] * 3,
+    })
+
+
+def check(label, values):
+    if values != EXPECTED:
+        print(f"FAIL {label}: {values} != {EXPECTED}")
+        return False
+    print(f"ok   {label}")
+    return True
+
+
+def check_results_types():
+    # as clean_results_df leaves them: blanks make pd.to_numeric(downcast='integer') return floats
+    df = pd.DataFrame({
+        'Pos': pd.to_numeric(pd.Series(['1', '2', '3']), downcast='integer'),
+        'Car': ['5', '10', '27'],
+        'Pts': pd.to_numeric(pd.Series(['50', '', '35']), downcast='integer', errors='coerce'),
+        'Best Lap': pd.to_numeric(pd.Series(['12', '', '40']), downcast='integer', errors='coerce'),
+        'Avg Speed': pd.to_numeric(pd.Series(['180.5', '179.25', '']), errors='coerce'),
+    })
+    schema = pq.read_table(io.BytesIO(to_parquet_bytes(df, 'results'))).schema
+    expected = {'Pos': pa.int16(), 'Pts': pa.int16(), 'Best Lap': pa.int32(), 'Avg Speed': pa.float64()}
+    got = {name: schema.field(name).type for name in expected}
+    if got != expected:
+        print(f"FAIL results column types: {got} != {expected}")
+        return False
+    print(f"ok   results column types {', '.join(f'{k}={v}' for k, v in got.items())}")
+    return True
+
+
+def main():
+    ok = True
+    for label, fills in (('"r,g,b" strings', ['255,0,0', '0,255,128', None]),
+                         ('(r, g, b) tuples', [(255, 0, 0), (0, 255, 128), None])):
+        table = pq.read_table(io.BytesIO(to_parquet_bytes(lap_chart_frame(fills), 'lapcharts')))
+        for column in ('Color', 'lap_fill'):
+            ok &= check(f'{label} -> {column}', table.column(column).to_pylist())
+
+    # outputs from before the schema registry: plain "r,g,b" strings and fill lists
+    schema = registered_schema('lapcharts')
+    old_strings = pa.Table.from_pandas(lap_chart_frame(['255,0,0', '0,255,128', None]), preserve_index=False)
+    old_lists = pa.table({'Color': pa.array([[255, 0, 0], [0, 255, 128], None], pa.list_(pa.int64()))})
+    ok &= check('old "r,g,b" output via conform_table', conform_table(old_strings, schema).column('Color').to_pylist())
+    ok &= check('old fill-list output via conform_table', conform_table(old_lists, schema).column('Color').to_pylist())
+    ok &= check_results_types()
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,72 @@
+"""Compare the camelot and fitz table engines of parse_results_pdf across the results archive.
+
+For every PDF in data/pdfs/results/ both engines are run through parse_results_pdf and
+clean_results_df. The script prints total time per engine and how many files came out
+identical, different or failed, and writes the per-file report to
+data/logs/results_engine_report.csv.
+
+Run from the repo root:
+    python -m benchmarks.compare_results_engines [max_files]
+"""
+import os
+import sys
+import time
+import pandas as pd
+from indycar_analytics.results.cleaning import parse_results_pdf, clean_results_df
+
+RESULTS_DIR = os.path.join('data', 'pdfs', 'results')
+REPORT_PATH = os.path.join('data', 'logs', 'results_engine_report.csv')
+
+
+def run_engine(path, engine):
+    start = time.perf_counter()
+    try:
+        df = clean_results_df(parse_results_pdf(path, engine=engine))
+        error = ''
+    except Exception as e:
+        df, error = None, str(e)
+    return df, time.perf_counter() - start, error
+
+
+def compare(camelot_df, fitz_df):
+    if camelot_df is None or fitz_df is None:
+        return 'failed'
+    a = camelot_df.reset_index(drop=True).astype(str)
+    b = fitz_df.reset_index(drop=True).astype(str)
+    if list(a.columns) != list(b.columns):
+        return 'columns differ'
+    if a.shape != b.shape:
+        return 'rows differ'
+    return 'identical' if a.equals(b) else 'values differ'
+
+
+def main(max_files=None):
+    files = sorted(f for f in os.listdir(RESULTS_DIR) if f.endswith('.pdf'))[:max_files]
+    report = []
+    for file in files:
+        path = os.path.join(RESULTS_DIR, file)
+        camelot_df, camelot_time, camelot_error = run_engine(path, 'camelot')
+        fitz_df, fitz_time, fitz_error = run_engine(path, 'fitz')
+        report.append({
+            'file': file,
+            'status': compare(camelot_df, fitz_df),
+            'camelot_s': camelot_time,
+            'fitz_s': fitz_time,
+            'camelot_error': camelot_error,
+            'fitz_error': fitz_error,
+        })
+
+    report = pd.DataFrame(report)
+    if report.empty:
+        print(f'No PDFs found in {RESULTS_DIR}')
+        return
+
+    report.to_csv(REPORT_PATH, index=False)
+    print(f'{len(report)} files -> {REPORT_PATH}')
+    print(report['status'].value_counts().to_string())
+    print(f"camelot: {report.camelot_s.sum():.1f}s  fitz: {report.fitz_s.sum():.1f}s  "
+          f"speedup {report.camelot_s.sum() / report.fitz_s.sum():.1f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,66 @@
+"""Write synthetic results PDFs laid out like the race box scores.
+
+For running compare_results_engines without downloaded reports: each file has title
+lines, a header row (Pos, SP, Car, Driver, C/A/E/T, Laps, Laps Down, Pit Stops, Avg Speed,
+Running / Reason Out, Pts, Total Pts) with a word-wrapped "Laps / Down" column, one
+row per car, and a footer. Field sizes, names and values are random per file; only the
+layout resembles the real reports, so parity here does not stand in for the archive.
+
+Run from the repo root:
+    python -m benchmarks.make_results_pdfs data/pdfs/results [files]
+"""
+import os
+import random
+import sys
+import fitz
+
+DRIVERS = ["Alex Palou", "Pato O'Ward", "Scott Dixon", "Josef Newgarden", "Will Power", "Scott McLaughlin",
+           "Colton Herta", "Kyle Kirkwood", "Marcus Ericsson", "Felix Rosenqvist", "Alexander Rossi",
+           "Christian Lundgaard", "Rinus VeeKay", "David Malukas", "Graham Rahal", "Santino Ferrucci",
+           "Conor Daly", "Marcus Armstrong", "Romain Grosjean", "Callum Ilott", "Kyffin Simpson",
+           "Louis Foster", "Nolan Siegel", "Sting Ray Robb", "Devlin DeFrancesco", "Robert Shwartzman", "Jacob Abel"]
+REASONS = ['Running', 'Running', 'Running', 'Contact', 'Mechanical', 'Off Course']
+# (header, x) - the column's left edge; Laps Down is wrapped onto two header lines
+COLUMNS = [('Pos', 30), ('SP', 58), ('Car', 84), ('Driver', 112), ('C/A/E/T', 250), ('Laps', 300),
+           ('Down', 334), ('Pit Stops', 370), ('Avg Speed', 420), ('Running / Reason Out', 480),
+           ('Pts', 600), ('Total Pts', 630)]
+
+
+def results_page(doc, race, cars, laps):
+    page = doc.new_page(width=792, height=612)
+    page.insert_text((30, 30), f"NTT INDYCAR SERIES - {race}", fontsize=11)
+    page.insert_text((30, 46), f"Official Box Score - Race Results - {laps} laps", fontsize=9)
+    page.insert_text((dict(COLUMNS)['Down'], 74), "Laps", fontsize=7)
+    for header, x in COLUMNS:
+        page.insert_text((x, 84), header, fontsize=7)
+
+    grid = random.sample(range(1, len(cars) + 1), len(cars))
+    leader_speed = random.uniform(150, 220)
+    y = 100
+    for pos, (car, driver) in enumerate(cars, start=1):
+        reason = random.choice(REASONS) if pos > len(cars) * 0.7 else 'Running'
+        down = 0 if pos <= 8 else random.randint(1, 3) if reason == 'Running' else random.randint(5, laps // 2)
+        values = [str(pos), str(grid[pos - 1]), str(car), driver, random.choice(['D/H/F', 'D/C/F']),
+                  str(laps - down), str(down), str(random.randint(2, 6)),
+                  f"{leader_speed - pos * random.uniform(0, 0.3):.3f}", reason,
+                  str(max(5, 51 - pos * 2)), str(random.randint(100, 600))]
+        for (_, x), value in zip(COLUMNS, values):
+            page.insert_text((x, y), value, fontsize=7)
+        y += 13
+    page.insert_text((30, y + 20), "Margin of victory: 1.2345 sec", fontsize=7)
+
+
+def main(folder, files=20, seed=1):
+    random.seed(seed)
+    os.makedirs(folder, exist_ok=True)
+    for i in range(files):
+        field = random.randint(18, len(DRIVERS))
+        cars = list(zip(random.sample(range(2, 99), field), random.sample(DRIVERS, field)))
+        doc = fitz.open()
+        results_page(doc, f"Synthetic Grand Prix {i + 1}", cars, random.randint(80, 250))
+        doc.save(os.path.join(folder, f"20250301;{9000 + i};synthetic{i + 1};RACE;results.pdf"))
+    print(f'{files} results PDFs -> {folder}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1], *(int(a) for a in sys.argv[2:3]))
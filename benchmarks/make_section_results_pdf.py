@@ -0,0 +1,65 @@
+"""Write a synthetic section results PDF laid out like the new-format reports.
+
+For running bench_section_cleaning and parse_section_results_file without downloaded
+reports: one page per car per 15 laps, each with the "Section Data for Car N - Driver"
+title, a "Lap T/S <sections>" header row spanning the table, and a block per lap with
+its T and S rows on green or yellow fills, followed by the section legend page.
+The values are random; only the layout matches the real reports.
+
+Run from the repo root:
+    python -m benchmarks.make_section_results_pdf data/pdfs/sectionresults/synthetic.pdf [laps]
+"""
+import random
+import sys
+import fitz
+
+SECTIONS = ['SF to T1', 'T1 to T2', 'T2 to SF']
+CARS = [(5, "Pato O'Ward"), (10, 'Alex Palou'), (27, 'Kyle Kirkwood'), (2, 'Josef Newgarden')]
+GREEN, YELLOW = (144 / 255, 237 / 255, 144 / 255), (1, 1, 0)
+LAPS_PER_PAGE = 15
+COLUMN_X, COLUMN_WIDTH = 110, 90
+
+
+def car_page(doc, car, driver, laps):
+    page = doc.new_page(width=792, height=612)
+    page.insert_text((40, 40), f"Section Data for Car {car} - {driver}", fontsize=12)
+    # padded so its right edge is one column past the last, like the real header row
+    header = "Lap T/S      " + "       ".join(SECTIONS)
+    while fitz.get_text_length(header, fontsize=9) + 40 < COLUMN_X + COLUMN_WIDTH * len(SECTIONS):
+        header += " "
+    page.insert_text((40, 80), header + ".", fontsize=9)
+
+    y = 110
+    for lap in laps:
+        fill = YELLOW if lap % 7 == 0 else GREEN
+        page.insert_text((40, y + 9), str(lap), fontsize=8)
+        for row, label in enumerate(('T', 'S')):
+            row_y = y + row * 11
+            page.insert_text((70, row_y + 9), label, fontsize=8)
+            for i in range(len(SECTIONS)):
+                x = COLUMN_X + i * COLUMN_WIDTH
+                page.draw_rect(fitz.Rect(x - 2, row_y, x + 60, row_y + 11), color=None, fill=fill)
+                value = f"{random.uniform(10, 20):.4f}" if label == 'T' else f"{random.uniform(180, 220):.3f}"
+                page.insert_text((x, row_y + 9), value, fontsize=8)
+        y += 30
+
+
+def main(path, laps=45, seed=1):
+    random.seed(seed)
+    doc = fitz.open()
+    for car, driver in CARS:
+        for first in range(1, laps + 1, LAPS_PER_PAGE):
+            car_page(doc, car, driver, range(first, min(first + LAPS_PER_PAGE, laps + 1)))
+
+    legend = doc.new_page(width=792, height=612)
+    legend.insert_text((40, 40), "Name", fontsize=9)
+    legend.insert_text((200, 40), "Length", fontsize=9)
+    for i, section in enumerate(SECTIONS):
+        legend.insert_text((40, 60 + i * 14), section, fontsize=9)
+        legend.insert_text((200, 60 + i * 14), f"0.{300 + i * 100} miles", fontsize=9)
+    doc.save(path)
+    print(f'{path}: {doc.page_count} pages, {len(CARS)} cars x {laps} laps x {len(SECTIONS)} sections')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1], *(int(a) for a in sys.argv[2:3]))
@@ -1,20 +1,35 @@
 import os
 from io import StringIO
-import pandas as pd
 from ..util.session_routing import get_session_prefix
-from google.cloud import storage
-from google.oauth2 import service_account
-
-# set up GCS
-credentials_path = os.getenv(
-    "GOOGLE_APPLICATION_CREDENTIALS",
-    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "dbt-service-account-credentials.json"))
-)
-credentials = service_account.Credentials.from_service_account_file(credentials_path)
-client = storage.Client(credentials=credentials, project=credentials.project_id)
-bucket = client.bucket("motorstats-clean-pq")
-def parse_and_clean_html_results(files):
-    failed_files = []
+from ..util.storage import get_storage
+from ..util.manifest import BlobManifest
+from ..util.batch import run_batch
+from ..util.schemas import to_parquet_bytes
+from ..util.stamps import source_stamp
+
+# bump when a change to the table parsing changes the output, util.reprocess then rebuilds every file
+PARSER_VERSION = 2
+
+def html_results_object_path(file):
+    parquetfile = file.replace('.html', '.pq')
+    session_prefix = get_session_prefix(file, session_token_index=2)
+    return f"results/HTML/{session_prefix}/{parquetfile}"
+
+def parse_html_results_file(file):
+    """(object name, parquet bytes, stamp) for one saved results table."""
+    import pandas as pd
+
+    path = os.path.join('data', 'html', 'results', file)
+    with open(path, 'r', encoding='utf-8') as f:
+        table_html = f.read()
+
+    df = pd.read_html(StringIO(table_html), converters={'No.': str})[0]
+    df['file'] = file
+    stamp = source_stamp(path, 'html_results', PARSER_VERSION)
+    return html_results_object_path(file), to_parquet_bytes(df, 'html_results', stamp), stamp
+
+def parse_and_clean_html_results(files, manifest_ttl=None, upload_workers=4, storage=None, workers=None, chunksize=1):
+    storage = storage or get_storage()
 
     # if files is 'All', get the list of all files
     if type(files) == str:
@@ -23,37 +38,28 @@ def parse_and_clean_html_results(files):
         else:
             files = [files]
 
+    # one listing of the destination prefix instead of an exists() call per file
+    manifest = BlobManifest(storage, 'results/HTML/', ttl=manifest_ttl)
+
+    todo = []
     for file in files:
-        try:
-            if file.split('.')[-1] != 'html':
-                print(f'Skipping file {file}')
-                continue
-
-            parquetfile = file.replace('.html', '.pq')
-            session_prefix = get_session_prefix(file, session_token_index=2)
-            gcs_object_path = f"results/HTML/{session_prefix}/{parquetfile}"
-
-            if bucket.blob(gcs_object_path).exists():
-                print(f"Skipping existing GCS object: gs://motorstats-clean-pq/{gcs_object_path}")
-                continue
-
-            with open(os.path.join('data', 'html', 'results', file), 'r', encoding='utf-8') as f:
-                table_html = f.read()
-
-            df = pd.read_html(StringIO(table_html), converters={'No.': str})[0]
-            df['file'] = file
-
-            blob = bucket.blob(gcs_object_path)
-            blob.upload_from_string(data=df.to_parquet(index=False), content_type="application/octet-stream")
-            print(f"Uploaded gs://motorstats-clean-pq/{gcs_object_path}")
-        except Exception as e:
-            failed_files.append(file)
-            print(f"FAILED {file}: {e}")
-
-    if failed_files:
-        print("\nFailed files:")
-        for f in failed_files:
-            print(f"- {f}")
+        if file.split('.')[-1] != 'html':
+            print(f'Skipping file {file}')
+            continue
+
+        gcs_object_path = html_results_object_path(file)
+        if manifest.exists(gcs_object_path):
+            print(f"Skipping existing object: {storage.uri(gcs_object_path)}")
+            continue
+        todo.append(file)
+
+    # parse in a process pool when workers > 1; the summary keeps the order of todo
+    summary = run_batch(parse_html_results_file, todo, storage, workers=workers, chunksize=chunksize,
+                        upload_workers=upload_workers)
+    for file, name in summary.uploaded:
+        manifest.add(name)
+        print(f"Uploaded {storage.uri(name)}")
+    summary.report()
 
 
 if __name__ == '__main__':
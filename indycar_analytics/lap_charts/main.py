@@ -1,59 +1,84 @@
 import os
-import fitz
-from google.cloud import storage
-from google.oauth2 import service_account
-from .parse_lap_charts import parse_lap_chart_file
+from ..util.storage import get_storage
+from ..util.manifest import BlobManifest
+from ..util.batch import run_batch
+from ..util.schemas import to_parquet_bytes
+from ..util.stamps import source_stamp
 
-# set up GCS
-credentials_path = os.getenv(
-    "GOOGLE_APPLICATION_CREDENTIALS",
-    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "dbt-service-account-credentials.json"))
-)
-credentials = service_account.Credentials.from_service_account_file(credentials_path)
-client = storage.Client(credentials=credentials, project=credentials.project_id)
-bucket = client.bucket("motorstats-clean-pq")
+LAPCHART_DIR = os.path.join('data', 'pdfs', 'lapchart')
 
+# bump when a change to parse_lap_charts.py changes the output, util.reprocess then rebuilds every file
+# 2: Color/lap_fill were written as nulls by v1 ("r,g,b" strings weren't recognised as fills)
+PARSER_VERSION = 2
 
-def parse_and_clean_lap_charts(files):
-    failed_files = []
-    lapchart_dir = os.path.join('data', 'pdfs', 'lapchart')
+
+def lap_chart_object_path(file):
+    return f"lapcharts/Race/{file.replace('.pdf', '.pq')}"
+
+def parse_lap_chart_pdf(file, page_workers=None, use_cache=True):
+    """(object name, parquet bytes, stamp) for one lap chart PDF, None when no rows were parsed."""
+    # heavy parsing dependencies are only loaded once there is work to do
+    import fitz
+    from .parse_lap_charts import (
+        parse_lap_chart_file,
+        parse_lap_chart_tables,
+        extract_lap_chart_file,
+        LAP_CHART_EXTRACT_VERSION,
+        LAP_CHART_TABLES,
+    )
+    from ..util.extract_cache import cached_extract
+
+    path = os.path.join(LAPCHART_DIR, file)
+    if use_cache:
+        tables = cached_extract(path, 'lapchart', LAP_CHART_EXTRACT_VERSION, LAP_CHART_TABLES,
+                                lambda p: extract_lap_chart_file(p, page_workers))
+        df = parse_lap_chart_tables(tables)
+    else:
+        doc = fitz.open(path)
+        df = parse_lap_chart_file(doc, workers=page_workers)
+
+    if df.empty:
+        return None
+
+    df['file'] = file
+    stamp = source_stamp(path, 'lapcharts', PARSER_VERSION)
+    return lap_chart_object_path(file), to_parquet_bytes(df, 'lapcharts', stamp), stamp
+
+def parse_and_clean_lap_charts(files, page_workers=None, use_cache=True, manifest_ttl=None, upload_workers=4, storage=None, workers=None, chunksize=1):
+    """Parse lap chart PDFs and upload one parquet file per chart.
+
+    workers > 1 parses whole files in a process pool; leave page_workers unset then,
+    since per-page pools are only worth it for a single large file.
+    """
+    storage = storage or get_storage()
 
     if type(files) == str:
         if files.lower() == 'all':
-            files = os.listdir(lapchart_dir)
+            files = os.listdir(LAPCHART_DIR)
         else:
             files = [files]
 
+    # one listing of the destination prefix instead of an exists() call per file
+    manifest = BlobManifest(storage, 'lapcharts/Race/', ttl=manifest_ttl)
+
+    todo = []
     for file in files:
-        try:
-            if file.split('.')[-1] != 'pdf':
-                print(f'Skipping file {file}')
-                continue
-
-            parquetfile = file.replace('.pdf', '.pq')
-            gcs_object_path = f"lapcharts/Race/{parquetfile}"
-
-            if bucket.blob(gcs_object_path).exists():
-                print(f"Skipping existing GCS object: gs://motorstats-clean-pq/{gcs_object_path}")
-                continue
-
-            doc = fitz.open(os.path.join(lapchart_dir, file))
-            df = parse_lap_chart_file(doc)
-
-            if df.empty:
-                print(f"No lap chart rows parsed for {file}")
-                continue
-
-            df['file'] = file
-
-            blob = bucket.blob(gcs_object_path)
-            blob.upload_from_string(data=df.to_parquet(index=False), content_type="application/octet-stream")
-            print(f"Uploaded gs://motorstats-clean-pq/{gcs_object_path}")
-        except Exception as e:
-            failed_files.append(file)
-            print(f"FAILED {file}: {e}")
-
-    if failed_files:
-        print("\nFailed files:")
-        for f in failed_files:
-            print(f"- {f}")
+        if file.split('.')[-1] != 'pdf':
+            print(f'Skipping file {file}')
+            continue
+
+        gcs_object_path = lap_chart_object_path(file)
+        if manifest.exists(gcs_object_path):
+            print(f"Skipping existing object: {storage.uri(gcs_object_path)}")
+            continue
+        todo.append(file)
+
+    # parse in a process pool when workers > 1; the summary keeps the order of todo
+    summary = run_batch(parse_lap_chart_pdf, todo, storage, workers=workers, chunksize=chunksize,
+                        upload_workers=upload_workers, page_workers=page_workers, use_cache=use_cache)
+    for file in summary.empty:
+        print(f"No lap chart rows parsed for {file}")
+    for file, name in summary.uploaded:
+        manifest.add(name)
+        print(f"Uploaded {storage.uri(name)}")
+    summary.report()
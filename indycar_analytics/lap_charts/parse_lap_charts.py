@@ -3,21 +3,16 @@ import pandas as pd
 import re
 import os
 import json
-from indycar_analytics.util.pdf_utils import get_page_fills
+from indycar_analytics.util.pdf_utils import get_page_fills, FillIndex, map_page_chunks, pack_fill, unpack_fills
+from indycar_analytics.util.pdf_utils import find_fill as find_rgb_fill
 
-def find_fill(span, filled_rects):
-    span_rect = fitz.Rect(span["bbox"])
-    y0, y1 = span_rect.y0, span_rect.y1
-
-    # Limit to rectangles that vertically intersect the span
-    for fr in filled_rects:
-        draw_rect = fr['rect']
-        if draw_rect.y1 >= y0 and draw_rect.y0 <= y1:
-            if draw_rect.intersects(span_rect):
-                fill = fr['fill']
-                return f"{fill[0]},{fill[1]},{fill[2]}" if fill else None
+# bump whenever extract_lap_chart_tables changes so cached extractions are rebuilt
+LAP_CHART_EXTRACT_VERSION = 1
+LAP_CHART_TABLES = ('blocks', 'lines', 'spans', 'chars', 'fills')
 
-    return None
+def find_fill(span, filled_rects):
+    fill = find_rgb_fill(span, filled_rects)
+    return f"{fill[0]},{fill[1]},{fill[2]}" if fill else None
 
 def _span_text(span):
     text = span.get('text')
@@ -63,130 +58,245 @@ def _span_digit_tokens(span):
 
     return tokens
 
-def parse_lap_chart_file(doc):
+def _parse_lap_chart_page(ptext, page_fills):
+    """Return the per-position DataFrames found on one page's rawdict text and fills."""
     dfs = []
+    page_fills = FillIndex(page_fills)
 
-    for page in doc:
-        ptext = page.get_text('rawdict')
-        page_fills = get_page_fills(page.get_drawings())
+    # Step 1: find the block containing 'Drivers in Race:' — this holds the lap numbers.
+    lap_block = next(
+        (b for b in ptext['blocks']
+         if b.get('lines') and any(
+             'Drivers in Race' in _span_text(s)
+             for l in b['lines'] for s in l.get('spans', []))),
+        None
+    )
+    if not lap_block:
+        return dfs
 
-        # Step 1: find the block containing 'Drivers in Race:' — this holds the lap numbers.
-        lap_block = next(
-            (b for b in ptext['blocks']
-             if b.get('lines') and any(
-                 'Drivers in Race' in _span_text(s)
-                 for l in b['lines'] for s in l.get('spans', []))),
-            None
-        )
-        if not lap_block:
+    # Collect lap entries: (number_text, fill). The header line is either first (2014+)
+    # or last (2013). Collect everything before/after it, then normalise to lap-1-first.
+    before, after = [], []
+    seen_header = False
+    for l in lap_block['lines']:
+        for s in l.get('spans', []):
+            text = _span_text(s).strip()
+            if not text:
+                continue
+            if 'Drivers in Race' in text:
+                seen_header = True
+                continue
+
+            for token, token_bbox in _span_digit_tokens(s):
+                fill = find_fill({'bbox': token_bbox}, page_fills)
+                (after if seen_header else before).append((token, fill))
+
+    # If laps follow the header use them directly; if they precede it they are
+    # in descending order (right-to-left in the PDF), so reverse.
+    page_laps = after if after else list(reversed(before))
+    lap_numbers = [lap for lap, _ in page_laps]
+    lap_fills   = [fill for _, fill in page_laps]
+
+    # Step 2: collect data-row blocks — any multi-line block where every line
+    # contains only digit tokens (car numbers). Sort by y to assign position rank.
+    # Explicitly exclude the lap_block so the header is never treated as a position row.
+    lap_block_y = lap_block['bbox'][1]
+    data_blocks = sorted(
+        [b for b in ptext['blocks']
+         if b is not lap_block and b.get('lines') and len(b['lines']) > 1
+         and _is_car_row(b) and not _is_uniform_block(b)
+         and b['bbox'][1] > lap_block_y],
+        key=lambda b: b['bbox'][1]
+    )
+
+    # Build a y -> position lookup from standalone single-line position-label blocks
+    # (single digit token at x ~182, same x as the position column).
+    POS_LABEL_X = 182.8
+    POS_LABEL_TOL = 8
+    pos_label_by_y = {}
+    for bl in ptext['blocks']:
+        blines = bl.get('lines', [])
+        if len(blines) != 1:
             continue
+        tokens = _span_tokens(blines[0])
+        spans = blines[0].get('spans', [])
+        if (len(tokens) == 1 and tokens[0].isdigit() and spans
+                and abs(spans[0]['bbox'][0] - POS_LABEL_X) < POS_LABEL_TOL):
+            pos_label_by_y[round(bl['bbox'][1], 1)] = int(tokens[0])
 
-        # Collect lap entries: (number_text, fill). The header line is either first (2014+)
-        # or last (2013). Collect everything before/after it, then normalise to lap-1-first.
-        before, after = [], []
-        seen_header = False
-        for l in lap_block['lines']:
-            for s in l.get('spans', []):
-                text = _span_text(s).strip()
-                if not text:
-                    continue
-                if 'Drivers in Race' in text:
-                    seen_header = True
-                    continue
+    def _is_pos_label_line(line):
+        """True if this line is a position-label (single digit at x ~182)."""
+        spans = line.get('spans', [])
+        tokens = _span_tokens(line)
+        return (len(tokens) == 1 and tokens[0].isdigit() and spans
+                and abs(spans[0]['bbox'][0] - POS_LABEL_X) < POS_LABEL_TOL)
 
-                for token, token_bbox in _span_digit_tokens(s):
-                    fill = find_fill({'bbox': token_bbox}, page_fills)
-                    (after if seen_header else before).append((token, fill))
-
-        # If laps follow the header use them directly; if they precede it they are
-        # in descending order (right-to-left in the PDF), so reverse.
-        page_laps = after if after else list(reversed(before))
-        lap_numbers = [lap for lap, _ in page_laps]
-        lap_fills   = [fill for _, fill in page_laps]
-
-        # Step 2: collect data-row blocks — any multi-line block where every line
-        # contains only digit tokens (car numbers). Sort by y to assign position rank.
-        # Explicitly exclude the lap_block so the header is never treated as a position row.
-        lap_block_y = lap_block['bbox'][1]
-        data_blocks = sorted(
-            [b for b in ptext['blocks']
-             if b is not lap_block and b.get('lines') and len(b['lines']) > 1
-             and _is_car_row(b) and not _is_uniform_block(b)
-             and b['bbox'][1] > lap_block_y],
-            key=lambda b: b['bbox'][1]
+    for seq_rank, b in enumerate(data_blocks, start=1):
+        # Determine position: prefer explicit label over sequential rank.
+        # 1. Check lines inside the block for an embedded position label.
+        embedded_pos = next(
+            (int(_span_tokens(l)[0]) for l in b['lines'] if _is_pos_label_line(l)),
+            None
         )
+        # 2. Check standalone label block at same y.
+        y_key = round(b['bbox'][1], 1)
+        position = embedded_pos or pos_label_by_y.get(y_key) or seq_rank
 
-        # Build a y -> position lookup from standalone single-line position-label blocks
-        # (single digit token at x ~182, same x as the position column).
-        POS_LABEL_X = 182.8
-        POS_LABEL_TOL = 8
-        pos_label_by_y = {}
-        for bl in ptext['blocks']:
-            blines = bl.get('lines', [])
-            if len(blines) != 1:
-                continue
-            tokens = _span_tokens(blines[0])
-            spans = blines[0].get('spans', [])
-            if (len(tokens) == 1 and tokens[0].isdigit() and spans
-                    and abs(spans[0]['bbox'][0] - POS_LABEL_X) < POS_LABEL_TOL):
-                pos_label_by_y[round(bl['bbox'][1], 1)] = int(tokens[0])
-
-        def _is_pos_label_line(line):
-            """True if this line is a position-label (single digit at x ~182)."""
-            spans = line.get('spans', [])
-            tokens = _span_tokens(line)
-            return (len(tokens) == 1 and tokens[0].isdigit() and spans
-                    and abs(spans[0]['bbox'][0] - POS_LABEL_X) < POS_LABEL_TOL)
-
-        for seq_rank, b in enumerate(data_blocks, start=1):
-            # Determine position: prefer explicit label over sequential rank.
-            # 1. Check lines inside the block for an embedded position label.
-            embedded_pos = next(
-                (int(_span_tokens(l)[0]) for l in b['lines'] if _is_pos_label_line(l)),
-                None
-            )
-            # 2. Check standalone label block at same y.
-            y_key = round(b['bbox'][1], 1)
-            position = embedded_pos or pos_label_by_y.get(y_key) or seq_rank
-
-            # In 2013 lines run right-to-left (last lap first), so reverse.
-            # Detect direction by comparing x of first vs last non-empty line.
-            def line_x(l):
-                spans = [s for s in l.get('spans', []) if _span_text(s).strip()]
-                return spans[0]['bbox'][0] if spans else None
-
-            first_x = next((line_x(l) for l in b['lines'] if line_x(l) is not None), None)
-            last_x  = next((line_x(l) for l in reversed(b['lines']) if line_x(l) is not None), None)
-            lines = list(reversed(b['lines'])) if (first_x and last_x and first_x > last_x) else b['lines']
-
-            lcars, fills = [], []
-            for l in lines:
-                if _is_pos_label_line(l):
-                    continue  # skip position-label lines — not car data
-                tokens = _span_tokens(l)
-                if not tokens or not all(t.isdigit() for t in tokens):
-                    continue
-
-                for s in l.get('spans', []):
-                    for token, token_bbox in _span_digit_tokens(s):
-                        lcars.append(token)
-                        fills.append(find_fill({'bbox': token_bbox}, page_fills))
-
-            row_count = len(lcars)
-            if not row_count:
+        # In 2013 lines run right-to-left (last lap first), so reverse.
+        # Detect direction by comparing x of first vs last non-empty line.
+        def line_x(l):
+            spans = [s for s in l.get('spans', []) if _span_text(s).strip()]
+            return spans[0]['bbox'][0] if spans else None
+
+        first_x = next((line_x(l) for l in b['lines'] if line_x(l) is not None), None)
+        last_x  = next((line_x(l) for l in reversed(b['lines']) if line_x(l) is not None), None)
+        lines = list(reversed(b['lines'])) if (first_x and last_x and first_x > last_x) else b['lines']
+
+        lcars, fills = [], []
+        for l in lines:
+            if _is_pos_label_line(l):
+                continue  # skip position-label lines — not car data
+            tokens = _span_tokens(l)
+            if not tokens or not all(t.isdigit() for t in tokens):
                 continue
 
-            lap_values      = lap_numbers[:row_count] + [None] * max(0, row_count - len(lap_numbers))
-            lap_fill_values = lap_fills[:row_count]   + [None] * max(0, row_count - len(lap_fills))
+            for s in l.get('spans', []):
+                for token, token_bbox in _span_digit_tokens(s):
+                    lcars.append(token)
+                    fills.append(find_fill({'bbox': token_bbox}, page_fills))
+
+        row_count = len(lcars)
+        if not row_count:
+            continue
+
+        lap_values      = lap_numbers[:row_count] + [None] * max(0, row_count - len(lap_numbers))
+        lap_fill_values = lap_fills[:row_count]   + [None] * max(0, row_count - len(lap_fills))
+
+        dfs.append(pd.DataFrame({
+            'Position': [position] * row_count,
+            'Car':      lcars,
+            'Color':    fills,
+            'lap':      lap_values,
+            'lap_fill': lap_fill_values,
+        }))
 
-            dfs.append(pd.DataFrame({
-                'Position': [position] * row_count,
-                'Car':      lcars,
-                'Color':    fills,
-                'lap':      lap_values,
-                'lap_fill': lap_fill_values,
-            }))
+    return dfs
 
+def _read_page(page):
+    return page.get_text('rawdict'), get_page_fills(page.get_drawings())
+
+def _parse_lap_chart_pages_from_path(path, pages):
+    with fitz.open(path) as doc:
+        return [df for p in pages for df in _parse_lap_chart_page(*_read_page(doc[p]))]
+
+def parse_lap_chart_file(doc, workers=None):
+    """Parse every page of a lap chart PDF into one DataFrame.
+
+    With workers > 1 pages are parsed in a process pool (doc must have been
+    opened from a path); the output is identical to the serial path.
+    """
+    if not workers or workers < 2 or doc.page_count < 2:
+        dfs = [df for page in doc for df in _parse_lap_chart_page(*_read_page(page))]
+    else:
+        chunks = map_page_chunks(_parse_lap_chart_pages_from_path, doc, workers)
+        dfs = [df for chunk in chunks for df in chunk]
+
+    return _combine_page_dfs(dfs)
+
+def _combine_page_dfs(dfs):
     if dfs:
         return pd.concat(dfs).reset_index(drop=True)
-    return pd.DataFrame()
\ No newline at end of file
+    return pd.DataFrame()
+
+def _extract_lap_chart_pages(doc, pages):
+    rows = {t: [] for t in LAP_CHART_TABLES}
+    for p in pages:
+        ptext, page_fills = _read_page(doc[p])
+
+        # image blocks carry no lines and are never looked at by the parser
+        for b, block in enumerate(ptext['blocks']):
+            if 'lines' not in block:
+                continue
+            rows['blocks'].append((p, b, *block['bbox']))
+            for l, line in enumerate(block['lines']):
+                rows['lines'].append((p, b, l))
+                for s, span in enumerate(line.get('spans', [])):
+                    rows['spans'].append((p, b, l, s, *span['bbox']))
+                    for c in span.get('chars', []):
+                        rows['chars'].append((p, b, l, s, c['c'], *c['bbox']))
+
+        for fr in page_fills:
+            rows['fills'].append((p, *fr['rect'], pack_fill(fr['fill'])))
+
+    bbox = ['x0', 'y0', 'x1', 'y1']
+    columns = {
+        'blocks': ['page', 'block'] + bbox,
+        'lines':  ['page', 'block', 'line'],
+        'spans':  ['page', 'block', 'line', 'span'] + bbox,
+        'chars':  ['page', 'block', 'line', 'span', 'c'] + bbox,
+        'fills':  ['page'] + bbox + ['fill'],
+    }
+    return {t: pd.DataFrame(rows[t], columns=columns[t]) for t in LAP_CHART_TABLES}
+
+def _extract_lap_chart_pages_from_path(path, pages):
+    with fitz.open(path) as doc:
+        return _extract_lap_chart_pages(doc, pages)
+
+def extract_lap_chart_tables(doc, workers=None):
+    """Flatten each page's rawdict text and filled rects into DataFrames (one per LAP_CHART_TABLES entry).
+
+    This is everything parse_lap_chart_file reads from PyMuPDF, so the tables can be
+    cached and re-parsed with parse_lap_chart_tables without decoding the PDF again.
+    """
+    if not workers or workers < 2 or doc.page_count < 2:
+        return _extract_lap_chart_pages(doc, range(doc.page_count))
+
+    chunks = map_page_chunks(_extract_lap_chart_pages_from_path, doc, workers)
+    return {t: pd.concat([c[t] for c in chunks], ignore_index=True) for t in LAP_CHART_TABLES}
+
+def extract_lap_chart_file(path, workers=None):
+    """extract_lap_chart_tables for the PDF at path, in the form cached_extract expects."""
+    with fitz.open(path) as doc:
+        return extract_lap_chart_tables(doc, workers)
+
+def _pages_from_tables(tables):
+    """Rebuild (rawdict-style text, fills) for each page from extract_lap_chart_tables output."""
+    pages, blocks, lines, spans = {}, {}, {}, {}
+
+    def page_entry(p):
+        return pages.setdefault(p, ({'blocks': []}, []))
+
+    for r in tables['blocks'].itertuples(index=False):
+        block = {'bbox': (r.x0, r.y0, r.x1, r.y1), 'lines': []}
+        blocks[(r.page, r.block)] = block
+        page_entry(r.page)[0]['blocks'].append(block)
+
+    for r in tables['lines'].itertuples(index=False):
+        line = {'spans': []}
+        lines[(r.page, r.block, r.line)] = line
+        blocks[(r.page, r.block)]['lines'].append(line)
+
+    for r in tables['spans'].itertuples(index=False):
+        span = {'bbox': (r.x0, r.y0, r.x1, r.y1), 'chars': []}
+        spans[(r.page, r.block, r.line, r.span)] = span
+        lines[(r.page, r.block, r.line)]['spans'].append(span)
+
+    for r in tables['chars'].itertuples(index=False):
+        spans[(r.page, r.block, r.line, r.span)]['chars'].append(
+            {'c': r.c, 'bbox': (r.x0, r.y0, r.x1, r.y1)})
+
+    fills = tables['fills']
+    for r, rgb in zip(fills.itertuples(index=False), unpack_fills(fills['fill'])):
+        page_entry(r.page)[1].append({
+            'rect': fitz.Rect(r.x0, r.y0, r.x1, r.y1),
+            'fill': tuple(int(c) for c in rgb),
+        })
+
+    return [pages[p] for p in sorted(pages)]
+
+def parse_lap_chart_tables(tables):
+    """Same output as parse_lap_chart_file, from (possibly cached) extract_lap_chart_tables output."""
+    return _combine_page_dfs([
+        df for ptext, page_fills in _pages_from_tables(tables)
+        for df in _parse_lap_chart_page(ptext, page_fills)
+    ])
\ No newline at end of file
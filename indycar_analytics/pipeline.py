@@ -0,0 +1,151 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from .util.storage import get_storage
+from .util.manifest import BlobManifest
+from .util.uploader import BackgroundUploader
+from .util.batch import BatchSummary
+from .results.main import parse_results_file, results_object_path, SKIP_FILES
+from .html_results.main import parse_html_results_file, html_results_object_path
+from .lap_charts.main import parse_lap_chart_pdf, lap_chart_object_path
+from .section_results.main import parse_section_results_file, section_results_object_path
+
+# data/<kind>/<folder>/ the scraper saves into -> (per-file parser, object path, manifest prefix)
+ROUTES = {
+    ('pdfs', 'results'): (parse_results_file, results_object_path, 'results/PDF/'),
+    ('pdfs', 'lapchart'): (parse_lap_chart_pdf, lap_chart_object_path, 'lapcharts/Race/'),
+    ('pdfs', 'sectionresults'): (parse_section_results_file, section_results_object_path, 'sectionresults/'),
+    ('html', 'results'): (parse_html_results_file, html_results_object_path, 'results/HTML/'),
+}
+EXTENSIONS = {'pdfs': '.pdf', 'html': '.html'}
+
+
+def route_file(path):
+    """ROUTES entry for a file saved by the scraper, None for reports without a parser."""
+    folder = os.path.dirname(os.path.normpath(path))
+    kind = os.path.basename(os.path.dirname(folder))
+    file = os.path.basename(path)
+    if kind not in EXTENSIONS or not file.endswith(EXTENSIONS[kind]):
+        return None
+    if (kind, os.path.basename(folder)) == ('pdfs', 'results') and any(bad in file for bad in SKIP_FILES):
+        return None
+    return ROUTES.get((kind, os.path.basename(folder)))
+
+
+class ParsePipeline:
+    """Parse and upload files as the scraper saves them.
+
+    submit(path) is the scraper's on_file callback. The file goes to the parser for its
+    folder (see ROUTES) in a process pool, and its output is uploaded on a BackgroundUploader
+    as soon as it is parsed, so parsing and uploading overlap with the crawl.
+    close() waits for everything and returns a BatchSummary in submission order.
+    """
+
+    def __init__(self, storage=None, workers=2, upload_workers=4, manifest_ttl=None):
+        self.storage = storage or get_storage()
+        self.manifest_ttl = manifest_ttl
+        self.prefixes = set()  # source prefixes that got new objects, for the combined outputs
+        self.summary = None
+        # spawned, not forked: the crawl's download and upload threads are running (and may
+        # hold locks) whenever the pool starts another worker
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        self._uploader = BackgroundUploader(max_workers=upload_workers)
+        self._manifests = {}
+        self._seen = set()
+        self._results = []
+        self._lock = threading.Lock()  # the scraper's download threads call submit concurrently
+
+    def _manifest(self, prefix):
+        # listed on first use, so a crawl that never saves a lap chart never lists lapcharts/
+        if prefix not in self._manifests:
+            self._manifests[prefix] = BlobManifest(self.storage, prefix, ttl=self.manifest_ttl)
+        return self._manifests[prefix]
+
+    def submit(self, path, force=False):
+        """Parse path unless its output exists; force reparses it anyway, e.g. for a revised report."""
+        route = route_file(path)
+        if route is None:
+            return
+        parse, object_path, prefix = route
+        file = os.path.basename(path)
+        with self._lock:
+            if path in self._seen:
+                return
+            if not force and self._manifest(prefix).exists(object_path(file)):
+                print(f"    Skipping existing object: {self.storage.uri(object_path(file))}")
+                return
+            self._seen.add(path)
+
+            entry = [file, 'pending', None]
+            self._results.append(entry)
+        # outside the lock: submit may start a worker process
+        future = self._pool.submit(parse, file)
+        future.add_done_callback(partial(self._parsed, entry, prefix))
+
+    def _parsed(self, entry, prefix, future):
+        error = future.exception()
+        if error is not None:
+            entry[1:] = 'failed', f'{type(error).__name__}: {error}'
+            return
+        result = future.result()
+        if result is None:
+            entry[1:] = 'empty', None
+            return
+        name, data, metadata = result
+        entry[1:] = 'uploading', name
+        self._uploader.submit(self.storage, name, data, key=(entry, prefix), metadata=metadata)
+
+    def close(self):
+        if self.summary is not None:
+            return self.summary
+
+        # shutdown returns after every done callback ran, so all uploads are queued by then
+        self._pool.shutdown(wait=True)
+        uploaded, failed = self._uploader.flush()
+        self._uploader.close()
+        for (entry, prefix), name in uploaded:
+            entry[1] = 'uploaded'
+            self._manifest(prefix).add(name)
+            self.prefixes.add(name.rsplit('/', 1)[0])
+        for (entry, _), name, e in failed:
+            entry[1:] = 'failed', f'upload {type(e).__name__}: {e}'
+
+        self.summary = BatchSummary([tuple(e) for e in self._results])
+        return self.summary
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def run_pipeline(firstYear=None, lastYear=None, race_url=None, site_domain="indycar.com",
+                 workers=2, upload_workers=4, storage=None, combine=True, revalidate=False, browsers=1):
+    """Crawl session reports and parse/upload each file as soon as it is saved.
+
+    Takes the arguments of download_session_reports. With revalidate=True reports the site
+    revised since they were downloaded are fetched again and reparsed over their old outputs.
+    With combine=True the combined_*.pq outputs that got new sources are then rebuilt incrementally.
+    """
+    from .scraper.download_session_reports import download_session_reports
+    from .util.concat_gcs_parquets import build_combined
+
+    storage = storage or get_storage()
+    with ParsePipeline(storage, workers=workers, upload_workers=upload_workers) as pipeline:
+        _, revised = download_session_reports(firstYear, lastYear, race_url, site_domain, on_file=pipeline.submit,
+                                              revalidate=revalidate, browsers=browsers)
+        # new files were submitted as they arrived, skipping any already parsed; only
+        # revised ones are reparsed over their old outputs
+        for path in revised:
+            pipeline.submit(path, force=True)
+
+    for file, name in pipeline.summary.uploaded:
+        print(f"Uploaded {storage.uri(name)}")
+    pipeline.summary.report()
+
+    if combine and pipeline.prefixes:
+        build_combined(prefixes=pipeline.prefixes, storage=storage)
+    return pipeline.summary
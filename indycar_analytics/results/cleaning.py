@@ -1,7 +1,6 @@
 import numpy as np
 import pandas as pd
 import re
-import camelot
 import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
@@ -206,20 +205,36 @@ def clean_section_results_page(dfp, st):
     dffinal.columns = [l1 if l1 != '' else l0 for l0, l1 in dffinal.columns]
     return dffinal
         
-def parse_results_pdf(file):
-    tables = camelot.read_pdf(file, pages="1", flavor="stream")  
+def read_page_tables(file, engine='camelot'):
+    """Raw string tables from page 1 of a results PDF.
+
+    engine='camelot' uses camelot's stream mode; engine='fitz' lays out the PyMuPDF
+    spans directly (see util.span_tables), which is much faster and doesn't need camelot.
+    """
+    if engine == 'camelot':
+        import camelot
+        return [t.df for t in camelot.read_pdf(file, pages="1", flavor="stream")]
+    if engine == 'fitz':
+        import fitz
+        from ..util.span_tables import extract_page_table
+        with fitz.open(file) as doc:
+            return [extract_page_table(doc, 0)]
+    raise ValueError(f"Unknown table engine {engine}. Use 'camelot' or 'fitz'.")
+
+def parse_results_pdf(file, engine='camelot'):
+    tables = read_page_tables(file, engine)
     for t in tables:
-        if (t.df.iloc[:-1] == 'Pos').max().max(): # header can bleed into last row of another table
+        if (t.iloc[:-1] == 'Pos').max().max(): # header can bleed into last row of another table
             col = 'Pos'
-        elif (t.df.iloc[:-1] == 'Rank').max().max():
+        elif (t.iloc[:-1] == 'Rank').max().max():
             col = 'Rank'
-        elif (t.df.iloc[:-1] == 'P').max().max():
+        elif (t.iloc[:-1] == 'P').max().max():
             col = 'P'
-        elif (t.df.iloc[:-1] == 'Pos  SP').max().max():
+        elif (t.iloc[:-1] == 'Pos  SP').max().max():
             col = 'Pos  SP'
         else:
             continue
-        df = t.df
+        df = t
         break
     
     # identify header and first column based on 'Pos' (always first col header)
@@ -1,19 +1,45 @@
 import os
-from .cleaning import parse_results_pdf, clean_results_df
 from ..util.session_routing import get_session_prefix
-from google.cloud import storage
-from google.oauth2 import service_account
+from ..util.storage import get_storage
+from ..util.manifest import BlobManifest
+from ..util.batch import run_batch
+from ..util.schemas import to_parquet_bytes
+from ..util.stamps import source_stamp
 
-# set up GCS
-credentials_path = os.getenv(
-    "GOOGLE_APPLICATION_CREDENTIALS",
-    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "dbt-service-account-credentials.json"))
+# bump when a change to cleaning.py changes the output, util.reprocess then rebuilds every file
+PARSER_VERSION = 2
+
+# exhibition race and some unusable PDFs
+SKIP_FILES = (
+    '$1 Million Challenge.pdf',
+    '20130524;2705;Indianapolis_500;PRACTICE_10;results.pdf',
+    '3528;KOHLER_Grand_Prix;PRACTICE_FINAL',
 )
-credentials = service_account.Credentials.from_service_account_file(credentials_path)
-client = storage.Client(credentials=credentials, project=credentials.project_id)
-bucket = client.bucket("motorstats-clean-pq")
-def parse_and_clean_results(files):
-    failed_files = []
+
+def results_object_path(file):
+    parquetfile = file.replace('.pdf', '.pq')
+    session_prefix = get_session_prefix(file, session_token_index=3, fallback_session_token_index=2)
+    return f"results/PDF/{session_prefix}/{parquetfile}"
+
+def results_parser(table_engine='camelot'):
+    # the two table engines can disagree, so outputs record which one built them
+    return f'results-{table_engine}'
+
+def parse_results_file(file, table_engine='camelot'):
+    """(object name, parquet bytes, stamp) for one results PDF."""
+    # camelot/fitz/pandas are only loaded once there is work to do
+    from .cleaning import parse_results_pdf, clean_results_df
+
+    # read and clean the main results table from the file then save as pq
+    path = os.path.join('data', 'pdfs', 'results', file)
+    df = parse_results_pdf(path, engine=table_engine)
+    dfclean = clean_results_df(df)
+    dfclean['file'] = file
+    stamp = source_stamp(path, results_parser(table_engine), PARSER_VERSION)
+    return results_object_path(file), to_parquet_bytes(dfclean, 'results', stamp), stamp
+
+def parse_and_clean_results(files, table_engine='camelot', manifest_ttl=None, upload_workers=4, storage=None, workers=None, chunksize=1):
+    storage = storage or get_storage()
 
     # if files is 'All', get the list of all files
     if type(files) == str:
@@ -22,45 +48,31 @@ def parse_and_clean_results(files):
         else:
             files = [files]
 
-    for file in files:
-        try:
-            # skip exhibition race and some unusable PDFs
-            indy_500_bad = '20130524;2705;Indianapolis_500;PRACTICE_10;results.pdf'
-            kohler_bad = '3528;KOHLER_Grand_Prix;PRACTICE_FINAL'
-            if (('$1 Million Challenge.pdf' in file) or 
-                (indy_500_bad in file) or (kohler_bad in file)):
-                continue
-            
-            if file.split('.')[-1] != 'pdf':
-                print(f'Skipping file {file}')
-                continue
-                
-            # read and clean the main results table from each file than save as pq
-            parquetfile = file.replace('.pdf', '.pq')
-            session_prefix = get_session_prefix(file, session_token_index=3, fallback_session_token_index=2)
-            gcs_object_path = f"results/PDF/{session_prefix}/{parquetfile}"
+    # one listing of the destination prefix instead of an exists() call per file
+    manifest = BlobManifest(storage, 'results/PDF/', ttl=manifest_ttl)
 
-            if bucket.blob(gcs_object_path).exists():
-                print(f"Skipping existing GCS object: gs://motorstats-clean-pq/{gcs_object_path}")
-                continue
+    todo = []
+    for file in files:
+        if any(bad in file for bad in SKIP_FILES):
+            continue
 
-            # parse pdf and clean resulting df
-            df = parse_results_pdf(os.path.join('data', 'pdfs', 'results', file))
-            dfclean = clean_results_df(df)
-            dfclean['file'] = file
+        if file.split('.')[-1] != 'pdf':
+            print(f'Skipping file {file}')
+            continue
 
-            # upload to GCS
-            blob = bucket.blob(gcs_object_path)
-            blob.upload_from_string(data=dfclean.to_parquet(index=False),content_type="application/octet-stream")
-            print(f"Uploaded gs://motorstats-clean-pq/{gcs_object_path}")
-        except Exception as e:
-            failed_files.append(file)
-            print(f"FAILED {file}: {e}")
+        gcs_object_path = results_object_path(file)
+        if manifest.exists(gcs_object_path):
+            print(f"Skipping existing object: {storage.uri(gcs_object_path)}")
+            continue
+        todo.append(file)
 
-    if failed_files:
-        print("\nFailed files:")
-        for f in failed_files:
-            print(f"- {f}")
+    # parse in a process pool when workers > 1; the summary keeps the order of todo
+    summary = run_batch(parse_results_file, todo, storage, workers=workers, chunksize=chunksize,
+                        upload_workers=upload_workers, table_engine=table_engine)
+    for file, name in summary.uploaded:
+        manifest.add(name)
+        print(f"Uploaded {storage.uri(name)}")
+    summary.report()
 
 if __name__ == '__main__':
-    parse_and_clean_results('all')
\ No newline at end of file
+    parse_and_clean_results('all')
@@ -0,0 +1,96 @@
+"""Record of every report the scraper downloaded, for conditional refreshes.
+
+One SQLite row per local file with its URL, the server's ETag/Last-Modified, size and
+sha256. DownloadQueue(revalidate=True) sends those validators back as a conditional
+GET, so unchanged reports come back as 304 and only revised ones are transferred.
+changed_at is set whenever a file is new or its content hash changed; list the files
+changed since a date with:
+    python -m indycar_analytics.scraper.download_manifest 2025-06-01
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+DOWNLOAD_MANIFEST_PATH = os.path.join('data', 'cache', 'downloads.sqlite')
+
+COLUMNS = ('path', 'url', 'etag', 'last_modified', 'size', 'sha256', 'part_validator', 'checked_at', 'changed_at')
+
+
+class DownloadManifest:
+    """Thread-safe; DownloadQueue workers record into one shared manifest."""
+
+    def __init__(self, path=DOWNLOAD_MANIFEST_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS downloads ('
+            'path TEXT PRIMARY KEY, url TEXT, etag TEXT, last_modified TEXT, size INTEGER, sha256 TEXT, '
+            'part_validator TEXT, checked_at REAL, changed_at REAL)'
+        )
+        self._db.commit()
+
+    @staticmethod
+    def _key(path):
+        return os.path.normpath(path)
+
+    def get(self, path):
+        with self._lock:
+            row = self._db.execute(
+                f'SELECT {", ".join(COLUMNS)} FROM downloads WHERE path = ?', (self._key(path),)
+            ).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def begin(self, path, url, validator):
+        """Remember the ETag/Last-Modified of a transfer in progress, for If-Range on resume."""
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO downloads (path, url, part_validator) VALUES (?, ?, ?) '
+                'ON CONFLICT(path) DO UPDATE SET url = excluded.url, part_validator = excluded.part_validator',
+                (self._key(path), url, validator),
+            )
+            self._db.commit()
+
+    def record(self, path, url, etag, last_modified, size, sha256, changed):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO downloads (path, url, etag, last_modified, size, sha256, part_validator, checked_at, changed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, NULL, ?, ?) '
+                'ON CONFLICT(path) DO UPDATE SET url = excluded.url, etag = excluded.etag, '
+                'last_modified = excluded.last_modified, size = excluded.size, sha256 = excluded.sha256, '
+                'part_validator = NULL, checked_at = excluded.checked_at, '
+                'changed_at = COALESCE(excluded.changed_at, downloads.changed_at)',
+                (self._key(path), url, etag, last_modified, size, sha256, now, now if changed else None),
+            )
+            self._db.commit()
+
+    def checked(self, path):
+        """The server confirmed path is unchanged (304)."""
+        with self._lock:
+            self._db.execute('UPDATE downloads SET checked_at = ? WHERE path = ?', (time.time(), self._key(path)))
+            self._db.commit()
+
+    def changed_since(self, since):
+        """Paths that were new or revised at or after the unix time since, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT path FROM downloads WHERE changed_at >= ? ORDER BY changed_at, path', (since,)
+            ).fetchall()
+        return [path for path, in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+if __name__ == '__main__':
+    since = datetime.fromisoformat(sys.argv[1]).timestamp() if len(sys.argv) > 1 else 0
+    manifest = DownloadManifest()
+    for path in manifest.changed_since(since):
+        print(path)
+    manifest.close()
@@ -1,6 +1,8 @@
 import os
+import queue
+import threading
 import time
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from urllib.parse import urlparse
@@ -16,22 +18,31 @@ from selenium.common.exceptions import (
     ElementClickInterceptedException,
     StaleElementReferenceException,
 )
-
-options = Options()
-options.headless = False
-
-
-def normalize_race_name_token(race_name):
-    normalized = race_name.replace("'", "").replace(";", "_").replace("_", " ").strip()
-    return "_".join(normalized.title().split())
-
-
-def normalize_session_name_token(session_name):
-    normalized = session_name.replace("'", "").replace(";", "_").replace(" ", "_")
-    return normalized.upper()
+from .naming import normalize_race_name_token, normalize_session_name_token
+from .downloads import DownloadQueue
+from .download_manifest import DownloadManifest
+from .timing import CrawlTimer
+
+# race page state: the header, date, results table and report links, None until they render.
+# Any session or race switch changes it, so waits compare against the state before the click.
+RACE_STATE_JS = """
+const header = document.querySelector('p.tabs-details-header');
+const descriptor = document.querySelector('p.tabs-details-descriptor');
+const table = document.getElementById('race-results-table');
+if (!descriptor || !descriptor.textContent.trim() || !table) return null;
+const reports = document.getElementById('reports-content');
+return [header ? header.textContent : '', descriptor.textContent, table.innerHTML, reports ? reports.innerHTML : ''].join('\\n');
+"""
+# season state: the race dropdown for the selected year, or 'moved' on the "Object moved" page
+SEASON_STATE_JS = """
+if (document.body && document.body.innerText.includes('Object moved to')) return 'moved';
+const button = document.getElementById('race-select-button');
+return button ? button.parentElement.innerHTML : null;
+"""
 
 
 def save_results_table_html(driver, session_date, race_name, session_name, series_tag=""):
+    """Save the session's results table under data/html/results and return its path."""
     table_html = driver.find_element(By.ID, "race-results-table").get_attribute("outerHTML")
     safe_race_name = normalize_race_name_token(race_name)
     safe_session_name = normalize_session_name_token(session_name)
@@ -45,6 +56,7 @@ def save_results_table_html(driver, session_date, race_name, session_name, serie
     with open(filepath, "w", encoding="utf-8") as f:
         f.write(table_html)
     print("    Saved html results table")
+    return filepath
 
 def wait_for_overlay_to_clear(driver, timeout=10):
     WebDriverWait(driver, timeout).until(
@@ -74,6 +86,41 @@ def click_with_retry(driver, locator, timeout=10, attempts=3):
         raise last_error
 
 
+def wait_for_state(driver, timer, step, state_js, previous=None, default_timeout=10, required=False):
+    """Wait until state_js returns something other than None and previous.
+
+    previous is the state captured before the click that should change the page. Returns
+    as soon as the new content is there instead of sleeping a fixed time; on timeout the
+    crawl carries on as it did after a sleep, and the next steps' own waits still apply.
+    With required the timeout raises TimeoutException instead: the page still shows the
+    previous race or session, and whatever is read from it would be saved under the
+    wrong name. Required waits adapt no lower than 5s, since missing one costs a retry.
+    """
+    timeout = timer.timeout(step, default_timeout, floor=5.0 if required else 2.0)
+
+    def changed(d):
+        state = d.execute_script(state_js)
+        return state is not None and state != previous
+
+    start = time.perf_counter()
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(changed)
+        ok = True
+    except TimeoutException:
+        ok = False
+        if not required:
+            print(f"    {step}: page not updated after {timeout:.1f}s, continuing")
+    timer.waited(step, time.perf_counter() - start, ok)
+    if not ok and required:
+        raise TimeoutException(f"{step}: page not updated after {timeout:.1f}s")
+    wait_for_overlay_to_clear(driver)
+    return ok
+
+
+def race_state(driver):
+    return driver.execute_script(RACE_STATE_JS)
+
+
 def recover_from_object_moved_page(driver):
     body_text = driver.find_element(By.TAG_NAME, "body").text
     if "Object moved to" not in body_text:
@@ -86,16 +133,35 @@ def recover_from_object_moved_page(driver):
             print("  Redirect page detected, following results link")
             driver.get(href)
             wait_for_overlay_to_clear(driver)
-            time.sleep(2)
+            try:
+                WebDriverWait(driver, 10).until(EC.any_of(
+                    EC.presence_of_element_located((By.ID, "race-select-button")),
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.race-tabs button.tab")),
+                ))
+            except TimeoutException:
+                pass
             return True
 
     return False
 
 
-def process_current_race(driver, wait, race_name, series_tag=""):
+def process_current_race(driver, wait, race_name, series_tag="", on_file=None, downloads=None, timer=None, previous=None):
+    """Save every session's results table and report PDFs for the race open in driver.
+
+    PDFs are queued on downloads (a DownloadQueue) and fetched in the background while
+    the browser moves on; without one a queue is made for this race and drained at the end.
+    on_file(path) is called for each newly saved file, e.g. to hand it to a parser
+    while the crawl continues. previous is race_state() from before the race was selected,
+    so the first read waits for the new race rather than the page it replaced.
+    """
+    own_downloads = downloads is None
+    if own_downloads:
+        downloads = DownloadQueue(on_file=on_file)
+    timer = timer or CrawlTimer()
+
     wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.race-tabs button.tab")))
-    wait_for_overlay_to_clear(driver)
-    time.sleep(2)
+    # raises if the previous race is still showing, so crawl_race reloads and tries again
+    wait_for_state(driver, timer, 'race loaded', RACE_STATE_JS, previous, required=True)
 
     session_tabs = driver.find_elements(By.CSS_SELECTOR, "div.race-tabs button.tab")
     session_names = [tab.text.strip() for tab in session_tabs]
@@ -108,20 +174,27 @@ def process_current_race(driver, wait, race_name, series_tag=""):
                 session_name = 'RACE'
                 
             session_tab_locator = (By.CSS_SELECTOR, f"div.race-tabs button.tab:nth-of-type({i + 1})")
-            session_tab = wait.until(EC.presence_of_element_located(session_tab_locator))
-            if "active" not in session_tab.get_attribute("class"):
-                click_with_retry(driver, session_tab_locator)
-            else:
-                wait_for_overlay_to_clear(driver)
-            time.sleep(2)
+            with timer.step('session tab'):
+                session_tab = wait.until(EC.presence_of_element_located(session_tab_locator))
+                if "active" not in session_tab.get_attribute("class"):
+                    before = race_state(driver)
+                    click_with_retry(driver, session_tab_locator)
+                    # raises if the tab didn't switch, so the session is skipped, not saved as the previous one
+                    wait_for_state(driver, timer, 'session loaded', RACE_STATE_JS, before, required=True)
+                else:
+                    wait_for_overlay_to_clear(driver)
 
-            date_elem = driver.find_element(By.CSS_SELECTOR, "p.tabs-details-descriptor")
-            session_date_text = date_elem.text.strip()
-            session_date = datetime.strptime(session_date_text, "%A, %B %d, %Y").strftime("%Y%m%d")
-            save_results_table_html(driver, session_date, race_name, session_name, series_tag)
+            with timer.step('save html'):
+                date_elem = driver.find_element(By.CSS_SELECTOR, "p.tabs-details-descriptor")
+                session_date_text = date_elem.text.strip()
+                session_date = datetime.strptime(session_date_text, "%A, %B %d, %Y").strftime("%Y%m%d")
+                html_path = save_results_table_html(driver, session_date, race_name, session_name, series_tag)
+            if on_file:
+                on_file(html_path)
 
             reports_section = driver.find_element(By.ID, "reports-content")
             pdf_links = reports_section.find_elements(By.CSS_SELECTOR, "a[href$='.pdf']")
+            queue_start = time.perf_counter()
 
             for link in pdf_links:
                 try:
@@ -143,29 +216,69 @@ def process_current_race(driver, wait, race_name, series_tag=""):
                         filename = f"{session_date};{race_id};{safe_race_name};{safe_session_name};{safe_report_name}.pdf"
                         filepath = os.path.join("./data", "pdfs", report_name, filename)
 
-                    if os.path.exists(filepath):
+                    exists = os.path.exists(filepath)
+                    if not downloads.submit(pdf_url, filepath, report_name):
                         print(f"    Skipping {report_name} (already exists)")
                         continue
-
-                    print(f"    Downloading {report_name}")
-                    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-                    r = requests.get(pdf_url)
-                    if r.status_code == 404:
-                        print(f"    404 error for {report_name}, skipping")
-                        continue
-                    r.raise_for_status()
-                    with open(filepath, "wb") as f:
-                        f.write(r.content)
+                    print(f"    {'Revalidating' if exists else 'Queued'} {report_name}")
                 except Exception as e:
                     print(f"    Error processing report {report_name if 'report_name' in locals() else '(unknown)'}: {e}")
                     continue
+            timer.add('queue pdfs', time.perf_counter() - queue_start)
         except Exception as e:
             print(f"  Error processing session {session_name}: {e}")
             continue
 
-    
-def download_session_reports(firstYear=None, lastYear=None, race_url=None, site_domain="indycar.com"):
-    
+    if own_downloads:
+        downloads.close()
+
+
+def select_year(driver, wait, results_url, year, timer):
+    """Load the results page and switch it to year's season."""
+    with timer.step('load results page'):
+        driver.get(results_url)
+        wait_for_overlay_to_clear(driver)
+
+    with timer.step('select year'):
+        button = wait.until(EC.element_to_be_clickable((By.ID, "season-select-button-race")))
+        # if year is already the page's season the race list won't change, only wait for it
+        before = None if str(year) in button.text else driver.execute_script(SEASON_STATE_JS)
+        driver.execute_script("arguments[0].click();", button)
+
+        year_option = wait.until(EC.element_to_be_clickable(
+            (By.XPATH, f"//div[@class='custom-select-menu show']//a[text()='{year}']")))
+        driver.execute_script("arguments[0].scrollIntoView(true);", year_option)
+        wait_for_overlay_to_clear(driver)
+        try:
+            wait.until(EC.element_to_be_clickable(year_option)).click()
+            wait_for_overlay_to_clear(driver)
+        except Exception:
+            driver.execute_script("arguments[0].click();", year_option)
+        wait_for_state(driver, timer, 'season loaded', SEASON_STATE_JS, before)
+
+    if not driver.find_elements(By.ID, "race-select-button"):
+        recover_from_object_moved_page(driver)
+
+
+def report_downloads(downloads, manifest, timer):
+    """Drain downloads and return (downloaded, revised): the new and revised files in
+    submission order, and the revised ones among them."""
+    with timer.step('finish downloads'):
+        downloaded, failed = downloads.close()
+    manifest.close()
+    timer.report()
+    print(f"\nDownloaded {len(downloaded)} reports ({len(downloads.revised)} revised), {len(failed)} failed")
+    for path in downloads.revised:
+        print(f"  Revised: {path}")
+    return downloaded, list(downloads.revised)
+
+
+def make_driver(headless=False):
+    options = Options()
+    options.headless = False
+    if headless:
+        options.add_argument("-headless")
+
     firefox_binary_paths = [
         "C:\\Program Files\\Mozilla Firefox\\firefox.exe",
         "C:\\Program Files (x86)\\Mozilla Firefox\\firefox.exe",
@@ -180,9 +293,185 @@ def download_session_reports(firstYear=None, lastYear=None, race_url=None, site_
     if firefox_binary:
         options.binary_location = firefox_binary
     
-        driver = webdriver.Firefox(service=Service(os.path.abspath("./geckodriver.exe")), options=options)
+    return webdriver.Firefox(service=Service(os.path.abspath("./geckodriver.exe")), options=options)
+
+
+def race_xpath(race_name):
+    if "'" in race_name:
+        return f'//div[contains(@class, "custom-select-menu") and contains(@class, "show")]//a[contains(text(), "{race_name}")]'
+    return f"//div[contains(@class, 'custom-select-menu') and contains(@class, 'show')]//a[contains(text(), '{race_name}')]"
+
+
+def list_races(driver, wait, results_url, year, timer):
+    """Switch the results page to year and return its race names, in menu order."""
+    select_year(driver, wait, results_url, year, timer)
+    print(year)
+
+    with timer.step('open race menu'):
+        button = wait.until(EC.element_to_be_clickable((By.ID, "race-select-button")))
+        button.click()
+        wait_for_overlay_to_clear(driver)
+
+        race_options = wait.until(EC.visibility_of_any_elements_located(
+            (By.XPATH, "//div[contains(@class, 'custom-select-menu') and contains(@class, 'show')]//a")))
+
+        race_names = []
+        for r in race_options:
+            race_names.append(r.text.strip())
+
+    print(race_names)
+
+    button = wait.until(EC.element_to_be_clickable((By.ID, "race-select-button")))
+    driver.execute_script("arguments[0].scrollIntoView(true);", button)
+    driver.execute_script("arguments[0].click();", button)
+    wait_for_overlay_to_clear(driver)
+    return race_names
+
+
+def crawl_race(driver, wait, results_url, year, race_name, series_tag, on_file, downloads, timer):
+    """Select race_name on the page already showing year and save its sessions.
+
+    Two attempts; before the second the page is reloaded and the year selected again.
+    Returns whether the race was processed.
+    """
+    print(f"\n{race_name}")
+    for attempt in range(2):
+        try:
+            with timer.step('select race'):
+                button = wait.until(EC.element_to_be_clickable((By.ID, "race-select-button")))
+                driver.execute_script("arguments[0].scrollIntoView(true);", button)
+                driver.execute_script("arguments[0].click();", button)
+                wait_for_overlay_to_clear(driver)
+
+                before = race_state(driver)
+                click_with_retry(driver, (By.XPATH, race_xpath(race_name)))
+            with timer.step('race'):
+                process_current_race(driver, wait, race_name, series_tag, on_file, downloads, timer, before)
+            return True
+        except Exception as e:
+            if attempt == 0:
+                select_year(driver, wait, results_url, year, timer)
+            else:
+                print(f"  Error processing race: {e}")
+    return False
+
 
+def crawl_worker(work, results_url, series_tag, on_file, downloads, headless=True):
+    """Take (year, race_name, retried) items from work until a None arrives.
+
+    An item with race_name None lists that season's races and queues one item per race.
+    Each worker drives its own browser and returns its CrawlTimer. A failed item is queued
+    once more for any worker to pick up; if the browser died, it is replaced first. If a
+    browser can't be started the worker raises, after marking its current item done.
+    """
+    timer = CrawlTimer()
+    driver = make_driver(headless)
     wait = WebDriverWait(driver, 10)
+    shown_year = None  # season the browser's results page is on
+    try:
+        while True:
+            item = work.get()
+            if item is None:
+                work.task_done()
+                return timer
+            year, race_name, retried = item
+            try:
+                if race_name is None:
+                    for name in list_races(driver, wait, results_url, year, timer):
+                        work.put((year, name, False))
+                    shown_year = year
+                else:
+                    if shown_year != year:
+                        select_year(driver, wait, results_url, year, timer)
+                        shown_year = year
+                    if not crawl_race(driver, wait, results_url, year, race_name, series_tag, on_file, downloads, timer):
+                        raise RuntimeError("race not processed")
+            except Exception as e:
+                print(f"  Error on {year} {race_name or 'race list'}: {e}")
+                shown_year = None
+                if not retried:
+                    work.put((year, race_name, True))
+                if not driver_alive(driver):
+                    print("  Browser lost, starting a new one")
+                    quit_driver(driver)
+                    driver = None
+                    driver = make_driver(headless)
+                    wait = WebDriverWait(driver, 10)
+            finally:
+                work.task_done()
+    finally:
+        if driver is not None:
+            quit_driver(driver)
+
+
+def driver_alive(driver):
+    try:
+        driver.execute_script("return 1;")
+        return True
+    except Exception:
+        return False
+
+
+def quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def crawl_sharded(firstYear, lastYear, results_url, series_tag, on_file, downloads, browsers, headless=True):
+    """Crawl firstYear..lastYear with browsers headless browsers sharing one work queue.
+
+    Returns the CrawlTimers of the workers that finished. Raises if every worker died
+    (e.g. geckodriver is missing) before the queue was drained.
+    """
+    work = queue.Queue()
+    for year in range(firstYear, lastYear + 1):
+        work.put((year, None, False))
+
+    # year items add race items before they are marked done, so join() waits for every race
+    drained = threading.Event()
+    threading.Thread(target=lambda: (work.join(), drained.set()), daemon=True).start()
+
+    with ThreadPoolExecutor(max_workers=browsers, thread_name_prefix='browser') as pool:
+        workers = [pool.submit(crawl_worker, work, results_url, series_tag, on_file, downloads, headless)
+                   for _ in range(browsers)]
+        # a dead worker never takes another item, so stop waiting once none are left
+        while not drained.wait(1):
+            if all(w.done() for w in workers):
+                break
+        left = work.unfinished_tasks
+        for _ in workers:
+            work.put(None)
+
+    errors = [w.exception() for w in workers if w.exception() is not None]
+    for error in errors:
+        print(f"Browser worker failed: {type(error).__name__}: {error}")
+    if not drained.is_set():
+        raise RuntimeError(f"every browser worker failed with {left} work items left") from errors[0]
+    return [w.result() for w in workers if w.exception() is None]
+
+    
+def download_session_reports(firstYear=None, lastYear=None, race_url=None, site_domain="indycar.com", on_file=None,
+                             download_workers=8, revalidate=False, browsers=1, headless=None):
+    """Crawl the results site and save every session's results table and report PDFs.
+
+    Returns (downloaded, revised): the PDFs that are new or changed, for downstream
+    reprocessing, and the revised ones among them. Every download is recorded in the
+    DownloadManifest; with revalidate=True reports that already exist are re-requested
+    conditionally and replaced only if the site revised them (revised files are in both
+    lists but are not passed to on_file).
+
+    Pages are read as soon as their content has changed rather than after fixed sleeps;
+    the time spent in each step is printed at the end.
+
+    browsers > 1 crawls the years in parallel: that many browsers (headless unless
+    headless=False) take years and races from a shared queue, and save into the same
+    data/pdfs and data/html folders through one DownloadQueue.
+    """
+    if headless is None:
+        headless = browsers > 1
+    timer = CrawlTimer()
 
     if race_url:
         race_url_domain = urlparse(race_url).netloc.lower()
@@ -194,6 +483,22 @@ def download_session_reports(firstYear=None, lastYear=None, race_url=None, site_
     series_tag = "indynxt" if "indynxt" in site_domain.lower() else ""
     results_url = f"https://www.{site_domain}/results"
 
+    if not race_url and (firstYear is None or lastYear is None):
+        raise ValueError("firstYear and lastYear are required when race_url is not provided")
+
+    # PDFs download in the background for the whole crawl
+    manifest = DownloadManifest()
+    downloads = DownloadQueue(max_workers=download_workers, on_file=on_file, manifest=manifest, revalidate=revalidate)
+
+    if not race_url and browsers > 1:
+        for worker_timer in crawl_sharded(firstYear, lastYear, results_url, series_tag, on_file, downloads,
+                                          browsers, headless):
+            timer.merge(worker_timer)
+        return report_downloads(downloads, manifest, timer)
+
+    driver = make_driver(headless)
+    wait = WebDriverWait(driver, 10)
+
     if race_url:
         driver.get(race_url)
         wait_for_overlay_to_clear(driver)
@@ -205,105 +510,17 @@ def download_session_reports(firstYear=None, lastYear=None, race_url=None, site_
             race_name = "single_race"
 
         print(f"\n{race_name}")
-        process_current_race(driver, wait, race_name, series_tag)
+        with timer.step('race'):
+            process_current_race(driver, wait, race_name, series_tag, on_file, downloads, timer)
+        result = report_downloads(downloads, manifest, timer)
         driver.quit()
-        return
-
-    if firstYear is None or lastYear is None:
-        raise ValueError("firstYear and lastYear are required when race_url is not provided")
+        return result
 
-    
     for YEAR in range(firstYear, lastYear+1):
-        driver.get(results_url)
-        wait_for_overlay_to_clear(driver)
-    
-        button = wait.until(EC.element_to_be_clickable((By.ID, "season-select-button-race")))
-        driver.execute_script("arguments[0].click();", button)
-
-        
-        year_option = wait.until(EC.element_to_be_clickable(
-            (By.XPATH, f"//div[@class='custom-select-menu show']//a[text()='{YEAR}']")))
-        
-        driver.execute_script("arguments[0].scrollIntoView(true);", year_option)
-        time.sleep(0.5)
-        wait_for_overlay_to_clear(driver)
-        
-        try:
-            year_option.click()
-            wait_for_overlay_to_clear(driver)
-        except Exception:
-            driver.execute_script("arguments[0].click();", year_option)
-    
-        print(YEAR)
-        time.sleep(2)
-
-        if not driver.find_elements(By.ID, "race-select-button"):
-            recover_from_object_moved_page(driver)
-        
-        button = wait.until(EC.element_to_be_clickable((By.ID, "race-select-button")))
-        button.click()
-        wait_for_overlay_to_clear(driver)
-    
-        time.sleep(2)
-    
-        race_options = wait.until(EC.presence_of_all_elements_located(
-            (By.XPATH, "//div[contains(@class, 'custom-select-menu') and contains(@class, 'show')]//a")))
-
-        race_names = []
-        for r in race_options:
-            race_names.append(r.text.strip())
-
-        print(race_names)
-
-        button = wait.until(EC.element_to_be_clickable((By.ID, "race-select-button")))
-        driver.execute_script("arguments[0].scrollIntoView(true);", button)
-        time.sleep(0.5)
-        driver.execute_script("arguments[0].click();", button)
-        wait_for_overlay_to_clear(driver)
-        
+        race_names = list_races(driver, wait, results_url, YEAR, timer)
         for race_name in race_names:
-            print(f"\n{race_name}")
-            race_processed = False
-            for attempt in range(2):
-                try:
-                    button = wait.until(EC.element_to_be_clickable((By.ID, "race-select-button")))
-                    driver.execute_script("arguments[0].scrollIntoView(true);", button)
-                    time.sleep(0.5)
-                    driver.execute_script("arguments[0].click();", button)
-                    wait_for_overlay_to_clear(driver)
-
-                    if "'" in race_name:
-                        xpath = f'//div[contains(@class, "custom-select-menu") and contains(@class, "show")]//a[contains(text(), "{race_name}")]'
-                    else:
-                        xpath = f"//div[contains(@class, 'custom-select-menu') and contains(@class, 'show')]//a[contains(text(), '{race_name}')]"
-
-                    click_with_retry(driver, (By.XPATH, xpath))
-                    process_current_race(driver, wait, race_name, series_tag)
-                    race_processed = True
-                    break
-                except Exception as e:
-                    if attempt == 0:
-                        driver.get(results_url)
-                        wait_for_overlay_to_clear(driver)
-
-                        button = wait.until(EC.element_to_be_clickable((By.ID, "season-select-button-race")))
-                        driver.execute_script("arguments[0].click();", button)
-                        year_option = wait.until(EC.element_to_be_clickable(
-                            (By.XPATH, f"//div[@class='custom-select-menu show']//a[text()='{YEAR}']")))
-                        driver.execute_script("arguments[0].scrollIntoView(true);", year_option)
-                        time.sleep(0.5)
-                        wait_for_overlay_to_clear(driver)
-                        try:
-                            year_option.click()
-                            wait_for_overlay_to_clear(driver)
-                        except Exception:
-                            driver.execute_script("arguments[0].click();", year_option)
-
-                        if not driver.find_elements(By.ID, "race-select-button"):
-                            recover_from_object_moved_page(driver)
-                    else:
-                        print(f"  Error processing race: {e}")
-            if not race_processed:
-                continue
+            crawl_race(driver, wait, results_url, YEAR, race_name, series_tag, on_file, downloads, timer)
                
+    result = report_downloads(downloads, manifest, timer)
     driver.quit()
+    return result
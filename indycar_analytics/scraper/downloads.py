@@ -0,0 +1,212 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from ..util.stamps import file_hash
+
+CHUNK_SIZE = 256 * 1024
+PART_SUFFIX = '.part'
+RETRYABLE = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+
+class IncompleteDownload(Exception):
+    pass
+
+
+def expected_size(r):
+    """Total size of the file behind response r, None when the server doesn't say."""
+    if r.status_code == 206:
+        total = r.headers.get('Content-Range', '').rsplit('/', 1)[-1]
+        return int(total) if total.isdigit() else None
+    length = r.headers.get('Content-Length')
+    if length is None or r.headers.get('Content-Encoding', 'identity') != 'identity':
+        return None
+    return int(length)
+
+
+class DownloadQueue:
+    """Download files in the background so the browser can keep navigating.
+
+    Workers share one requests.Session, so connections to a host are pooled and reused
+    instead of opened per file. At most per_host downloads run against one host at a time.
+    on_file(path) is called (from a worker thread) after each file is saved.
+
+    Bodies are streamed in chunks to path + '.part', checked against the server's size,
+    and only then renamed to path, so path never holds a truncated file. An interrupted
+    download (dropped connection, or a killed crawl leaving the .part behind) is resumed
+    with a Range request from the bytes already on disk.
+
+    With a DownloadManifest every saved file is recorded with its validators and hash.
+    revalidate=True then also re-requests files that already exist, conditionally, so
+    only reports the site has revised are transferred; those are replaced in place and
+    listed in .revised instead of being passed to on_file.
+    """
+
+    def __init__(self, max_workers=8, per_host=4, timeout=60, on_file=None, session=None, retries=3, backoff=1.0,
+                 manifest=None, revalidate=False):
+        if revalidate and manifest is None:
+            raise ValueError("revalidate needs a DownloadManifest to compare against")
+        self.manifest = manifest
+        self.revalidate = revalidate
+        self.revised = []
+        self.per_host = per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.on_file = on_file
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='download')
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def _host_slot(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self._hosts[host]
+
+    def _request_headers(self, path, offset):
+        entry = self.manifest.get(path) if self.manifest else None
+        headers = {}
+        if entry and os.path.exists(path):
+            # revalidating: the server answers 304 unless the report changed since we saved it
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        if offset:
+            headers['Range'] = f'bytes={offset}-'
+            if entry and entry['part_validator']:
+                # resume only if the .part came from the same version of the file
+                headers['If-Range'] = entry['part_validator']
+        return headers
+
+    def _finish(self, url, path, part, headers):
+        """Move a complete .part into place. Returns path, or None if its content is unchanged."""
+        if self.manifest is None:
+            os.replace(part, path)
+            return path
+
+        sha = file_hash(part)
+        old = None
+        if os.path.exists(path):
+            entry = self.manifest.get(path)
+            old = entry['sha256'] if entry and entry['sha256'] else file_hash(path)
+        changed = sha != old
+        if changed:
+            os.replace(part, path)
+        else:
+            os.remove(part)
+        self.manifest.record(path, url, headers.get('ETag'), headers.get('Last-Modified'),
+                             os.path.getsize(path), sha, changed)
+        if not changed:
+            return None
+        if old is not None:
+            with self._lock:
+                self.revised.append(path)
+        return path
+
+    def _fetch(self, url, path, label):
+        """One attempt at url -> path. Returns path, or None on a 404 or an unchanged file."""
+        part = path + PART_SUFFIX
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = self._request_headers(path, offset)
+
+        with self._host_slot(url), self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as r:
+            if r.status_code == 404:
+                print(f"    404 error for {label}, skipping")
+                return None
+            if r.status_code == 304:
+                self.manifest.checked(path)
+                if offset:
+                    os.remove(part)
+                return None
+            if r.status_code == 416:
+                # nothing left past offset: either the .part is already complete or it is junk
+                total = r.headers.get('Content-Range', '').rsplit('/', 1)[-1]
+                if total.isdigit() and int(total) == offset:
+                    return self._finish(url, path, part, r.headers)
+                os.remove(part)
+                raise IncompleteDownload(f'{label}: stale partial file, restarting')
+            r.raise_for_status()
+
+            if offset and r.status_code != 206:
+                offset = 0  # server ignored the Range header (or If-Range failed) and sent the whole file
+            if self.manifest and r.status_code == 200:
+                self.manifest.begin(path, url, r.headers.get('ETag') or r.headers.get('Last-Modified'))
+            total = expected_size(r)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(part, 'ab' if offset else 'wb') as f:
+                for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+
+            size = os.path.getsize(part)
+            if total is not None and size != total:
+                raise IncompleteDownload(f'{label}: got {size} of {total} bytes')
+            return self._finish(url, path, part, r.headers)
+
+    def _download(self, url, path, label):
+        for attempt in range(self.retries + 1):
+            try:
+                saved = self._fetch(url, path, label)
+                break
+            except RETRYABLE + (IncompleteDownload,):
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+        if saved and self.on_file and saved not in self.revised:
+            self.on_file(saved)
+        return saved
+
+    def submit(self, url, path, label=None):
+        """Queue url for download to path. Returns False if it is already queued, or if path
+        exists and the queue isn't revalidating."""
+        with self._lock:
+            if path in self._pending or (os.path.exists(path) and not self.revalidate):
+                return False
+            self._pending[path] = (label or os.path.basename(path),
+                                   self._pool.submit(self._download, url, path, label or os.path.basename(path)))
+        return True
+
+    def wait(self):
+        """Block until everything queued so far has finished.
+
+        Returns (downloaded, failed): downloaded is [path] of new and revised files, failed
+        is [(path, error)], both in submission order. 404s and unchanged files are in neither.
+        """
+        with self._lock:
+            pending = list(self._pending.items())
+        wait([f for _, (_, f) in pending])
+
+        downloaded, failed = [], []
+        for path, (label, future) in pending:
+            error = future.exception()
+            if error is not None:
+                print(f"    Error downloading {label}: {error}")
+                failed.append((path, error))
+            elif future.result() is not None:
+                downloaded.append(path)
+        with self._lock:
+            for path, _ in pending:
+                self._pending.pop(path, None)
+        return downloaded, failed
+
+    def close(self):
+        result = self.wait()
+        self._pool.shutdown(wait=True)
+        self.session.close()
+        return result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,12 @@
+# Filename tokens for downloaded session reports. Kept free of Selenium so the
+# parsers and pipeline code can build/route filenames without loading a browser driver.
+
+
+def normalize_race_name_token(race_name):
+    normalized = race_name.replace("'", "").replace(";", "_").replace("_", " ").strip()
+    return "_".join(normalized.title().split())
+
+
+def normalize_session_name_token(session_name):
+    normalized = session_name.replace("'", "").replace(";", "_").replace(" ", "_")
+    return normalized.upper()
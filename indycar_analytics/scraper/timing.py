@@ -0,0 +1,71 @@
+import time
+from contextlib import contextmanager
+
+# readiness waits only shorten their timeout once a step has this many successful samples
+ADAPT_AFTER = 5
+
+
+class CrawlTimer:
+    """Wall time per crawl step, plus timeouts for readiness waits that adapt to the site.
+
+    step(name) times a block; report() prints where the crawl spent its time. timeout(name)
+    starts at the default and, once the wait has succeeded a few times, drops to a multiple
+    of the slowest success seen, so a page that never changes costs seconds, not the default.
+    Steps may nest: 'race' includes the 'session tab' and 'save html' steps inside it.
+    """
+
+    def __init__(self):
+        self.steps = {}  # name -> [count, total seconds, max seconds]
+        self.waits = {}  # name -> slowest successful wait
+        self.successes = {}
+        self.timeouts = {}
+        self.started = time.perf_counter()
+
+    def add(self, name, seconds):
+        entry = self.steps.setdefault(name, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+    @contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def merge(self, other):
+        """Add another timer's steps and waits, e.g. one per browser of a sharded crawl."""
+        for name, (count, total, longest) in other.steps.items():
+            entry = self.steps.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += count
+            entry[1] += total
+            entry[2] = max(entry[2], longest)
+        for name, seconds in other.waits.items():
+            self.waits[name] = max(self.waits.get(name, 0.0), seconds)
+        for counts, others in ((self.successes, other.successes), (self.timeouts, other.timeouts)):
+            for name, count in others.items():
+                counts[name] = counts.get(name, 0) + count
+
+    def waited(self, name, seconds, ok):
+        self.add(f'wait: {name}', seconds)
+        if ok:
+            self.successes[name] = self.successes.get(name, 0) + 1
+            self.waits[name] = max(self.waits.get(name, 0.0), seconds)
+        else:
+            self.timeouts[name] = self.timeouts.get(name, 0) + 1
+
+    def timeout(self, name, default, floor=2.0, factor=3.0):
+        if self.successes.get(name, 0) < ADAPT_AFTER:
+            return default
+        return min(default, max(floor, factor * self.waits[name]))
+
+    def report(self, log=print):
+        elapsed = time.perf_counter() - self.started
+        log(f"\nCrawl time {elapsed:.1f}s by step:")
+        log(f"  {'step':<28}{'count':>7}{'total s':>10}{'mean s':>9}{'max s':>8}")
+        for name, (count, total, longest) in sorted(self.steps.items(), key=lambda kv: -kv[1][1]):
+            log(f"  {name:<28}{count:>7}{total:>10.1f}{total / count:>9.2f}{longest:>8.2f}")
+        for name, count in sorted(self.timeouts.items()):
+            log(f"  {name}: {count} waits timed out")
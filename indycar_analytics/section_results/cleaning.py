@@ -1,7 +1,7 @@
 import numpy as np
 import pandas as pd
 import re
-import camelot
+from indycar_analytics.util.pdf_utils import rows_to_columnar, unpack_fills
 import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
@@ -14,8 +14,8 @@ def get_lap_chart_fill_mapping():
 
 def get_y0_bbox_coord(block_df):
     # determine page orientation
-    x0std = block_df['bbox'].apply(lambda x: x[0]).std()
-    x1std = block_df['bbox'].apply(lambda x: x[1]).std()
+    x0std = block_df['x0'].std()
+    x1std = block_df['y0'].std()
     return 1 if x1std < x0std else 0
 
 def is_left_to_right(dfp):
@@ -29,6 +29,18 @@ def assign_column(x, headers):
     idx = np.argmin(np.abs(header_values - x))
     return header_keys[idx]
 
+def nearest_index(values, targets):
+    """Index of the nearest target for every value (first target wins ties, like np.argmin)."""
+    values = np.asarray(values, dtype=float)
+    if not len(values):
+        return np.zeros(0, dtype=int)
+    return np.abs(np.asarray(targets, dtype=float)[None, :] - values[:, None]).argmin(axis=1)
+
+def assign_columns(values, headers):
+    """Vectorized assign_column over an array of coordinates."""
+    header_keys = np.array(list(headers.keys()), dtype=object)
+    return header_keys[nearest_index(values, list(headers.values()))]
+
 def get_regex_pattern():
     section = r'(?:Turn[s]? |I|SF|FS|PI|PO|Lap|BackStretch)\d{0,2}[Aa]?(?:[\/\-]?\d{1,2}[Aa]?)?(?: Entry| Exit)?'
     
@@ -38,6 +50,15 @@ def get_regex_pattern():
         
     return full_pattern
 
+def classify_section_page(text):
+    """page_filter for parse_file: only car pages need fills, only the legend needs spans."""
+    if 'Section Data for Car' in text:
+        return 'full'
+    # legend page (and any continuation of its section table)
+    if ('Name' in text and 'Length' in text) or 'miles' in text:
+        return 'spans'
+    return None
+
 def get_legend_page(df):
     for p in range(df.page.max(),-1,-1):
         datalist = list(df.loc[df.page == p,'data'])
@@ -54,13 +75,14 @@ def parse_sections_table(df):
 
     return st
 
-def get_header_coords(dfh, st, dft_x0, dft_x1, l_to_r):
+def get_header_coords(dfh, st, dft_x0, dft_x1, l_to_r, layout=None):
 
-    pattern = r'|'.join([x['Name'] for x in st])
+    # compiled patterns come from the document layout when there is one
+    pattern = layout.section_pattern if layout else r'|'.join([x['Name'] for x in st])
     
     # fall back to regex pattern if st names don't appear in header text
     if not any(re.search(pattern, row['data']) for _, row in dfh.iterrows()):
-        pattern = get_regex_pattern()
+        pattern = layout.fallback_pattern if layout else get_regex_pattern()
     
     headers = {}
     for i in dfh.index:
@@ -85,6 +107,60 @@ def get_header_coords(dfh, st, dft_x0, dft_x1, l_to_r):
             
     return headers
 
+class SectionLayout:
+    """Section header geometry shared by every car page of one section results PDF.
+
+    Holds the compiled section-name patterns and the header column centers resolved
+    from the first page. Later pages whose header spans match reuse those centers;
+    a page with different header geometry is resolved from scratch and becomes the
+    new reference.
+    """
+
+    def __init__(self, st):
+        self.section_pattern = re.compile(r'|'.join([x['Name'] for x in st]))
+        self.fallback_pattern = re.compile(get_regex_pattern())
+        self.resolved = {}
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, kind, signature, build):
+        cached = self.resolved.get(kind)
+        if cached is not None and cached[0] == signature:
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        headers = build()
+        self.resolved[kind] = (signature, headers)
+        return headers
+
+    def header_signature(self, dfh, dft_x0, dft_x1, l_to_r):
+        """The inputs get_header_coords actually uses: the spans that hold section names, and
+        the data extents only when one of them carries the Lap T/S label. Page titles such as
+        "Section Data for Car N" are left out, so every car page of a document shares it."""
+        rows = list(zip(dfh['data'], dfh['bbox_x0'], dfh['bbox_x1']))
+        pattern = self.section_pattern
+        if not any(pattern.search(data) for data, _, _ in rows):
+            pattern = self.fallback_pattern
+        spans = tuple(row for row in rows if pattern.search(re.sub(r'Lap\s+T\/S', '', row[0])))
+        extents = (dft_x0, dft_x1) if any('T/S' in data for data, _, _ in spans) else None
+        return l_to_r, spans, extents
+
+    def header_coords(self, dfh, st, dft_x0, dft_x1, l_to_r):
+        """get_header_coords, skipped when the section header spans match the previous page."""
+        signature = self.header_signature(dfh, dft_x0, dft_x1, l_to_r)
+        return self.resolve('new', signature,
+                            lambda: get_header_coords(dfh, st, dft_x0, dft_x1, l_to_r, layout=self))
+
+    def old_format_header_coords(self, dfh, sec_axis):
+        """Header centers for the old format, where each header span sits on its section."""
+        signature = (sec_axis, tuple((data, pos) for data, pos in zip(dfh['data'], dfh[sec_axis])
+                                     if self.section_pattern.search(data)))
+        return self.resolve('old', signature, lambda: {
+            n: row[sec_axis] for _, row in dfh.iterrows()
+            for n in self.section_pattern.findall(row['data'])
+        })
+
 def get_block_laps(dfb):
     dfl = dfb.loc[dfb.cell_type == 'Lap Number',['data','block']]
     dfl2 = dfl.copy()
@@ -98,8 +174,52 @@ def get_fill_mapping():
     
     return pd.DataFrame({'Flag':list(fmap.keys()),'fill':list(fmap.values())})
 
+def get_flags(packed_fills):
+    """Nearest fill-mapping flag for every packed fill in one broadcast distance computation."""
+    df_fill = get_fill_mapping()
+    fill_arr = np.array(list(df_fill['fill']))
+    rgb = unpack_fills(packed_fills)
+    dist = ((rgb[:, None, :] - fill_arr[None, :, :])**2).sum(axis=2)
+    return df_fill['Flag'].to_numpy()[dist.argmin(axis=1)]
+
+def split_merged_cells(dfd):
+    """Expand rows where the PDF parser merged several values into one cell.
+
+    Each value gets an equal share of the original cell's x extent.
+    """
+    multi = dfd.data.str.match(r'^\d+\.?\d* \d', na=False)
+    if not multi.any():
+        return dfd
+
+    exp = dfd.loc[multi].copy()
+    exp['data'] = exp.data.str.split()
+    exp = exp.assign(_n=exp.data.str.len(), _row=np.arange(len(exp))).explode('data')
+    i = exp.groupby('_row').cumcount()
+    x0, x1, n = exp.bbox_x0, exp.bbox_x1, exp._n
+    new_x0 = x0 + i * (x1 - x0) / n
+    new_x1 = x0 + (i+1) * (x1 - x0) / n
+    exp['bbox_x0'] = new_x0
+    exp['bbox_x1'] = new_x1
+    exp = exp.drop(columns=['_n', '_row'])
+
+    return pd.concat([dfd.loc[~multi], exp]).sort_values(['block','line'])
 
-def clean_section_results_page(dfp, st):
+
+def clean_section_results_page(dfp, st, engine='numpy', layout=None):
+    """Clean one page of section results into Car/Driver/Lap/Section/Flag/Time/Speed rows.
+
+    engine='numpy' runs the vectorized column, merged-cell and flag assignment;
+    engine='python' keeps the original row-wise loops for comparison.
+    Pass the same SectionLayout for every page of a document to reuse its header geometry.
+    """
+    if engine not in ('numpy', 'python'):
+        raise ValueError(f"Unknown engine {engine}. Use 'numpy' or 'python'.")
+    if layout is None:
+        layout = SectionLayout(st)
+    
+    # accept row-dict output from parse_file as well as the columnar layout
+    if 'bbox' in dfp.columns:
+        dfp = rows_to_columnar(dfp)
     
     # get car and driver if its a section page
     try:
@@ -110,10 +230,14 @@ def clean_section_results_page(dfp, st):
     useblock = dfp.groupby('block')[['page']].count().idxmax().iloc[0]
     iy0 = get_y0_bbox_coord(dfp.loc[dfp.block == useblock])
     
-    dfp['bbox_y0'] = dfp.bbox.apply(lambda x: int(x[iy0]))
-    dfp['bbox_x0'] = dfp.bbox.apply(lambda x: int(x[1-iy0]))
-    dfp['bbox_y1'] = dfp.bbox.apply(lambda x: int(x[iy0+2]))
-    dfp['bbox_x1'] = dfp.bbox.apply(lambda x: int(x[3-iy0]))    
+    # assign returns a new frame, so the caller's page slice is never modified
+    coords = dfp[['x0','y0','x1','y1']].to_numpy()
+    dfp = dfp.assign(
+        bbox_y0=coords[:, iy0].astype(int),
+        bbox_x0=coords[:, 1-iy0].astype(int),
+        bbox_y1=coords[:, iy0+2].astype(int),
+        bbox_x1=coords[:, 3-iy0].astype(int),
+    )
     
     # get just the blocks with data (no header or page data)
     dfb = dfp.loc[dfp.block.isin(dfp.loc[dfp.data.isin(('T','S')),'block'])]
@@ -137,13 +261,18 @@ def clean_section_results_page(dfp, st):
         # lap via nearest match on the lap axis from the separate single-entry lap blocks
         lap_blocks = dfp.loc[dfp['data'].str.match(r'^[0-9]+$') & (dfp.block != useblock)]
         lap_vals, lap_nums = lap_blocks[ts_axis].values, lap_blocks['data'].values
-        dfd['Lap'] = dfd[ts_axis].apply(lambda x: lap_nums[np.argmin(np.abs(lap_vals - x))])
+        if engine == 'numpy':
+            dfd['Lap'] = np.asarray(lap_nums, dtype=object)[nearest_index(dfd[ts_axis], lap_vals)]
+        else:
+            dfd['Lap'] = dfd[ts_axis].apply(lambda x: lap_nums[np.argmin(np.abs(lap_vals - x))])
         
         # section headers are in the last block; sections run along sec_axis
-        dfh = dfp.loc[dfp.block == dfp.block.max()].copy()
-        pat = r'|'.join([x['Name'] for x in st])
-        headers = {n: row[sec_axis] for _, row in dfh.iterrows() for n in re.findall(pat, row['data'])}
-        dfd['Section'] = dfd[sec_axis].apply(lambda y: assign_column(y, headers))
+        dfh = dfp.loc[dfp.block == dfp.block.max()]
+        headers = layout.old_format_header_coords(dfh, sec_axis)
+        if engine == 'numpy':
+            dfd['Section'] = assign_columns(dfd[sec_axis], headers)
+        else:
+            dfd['Section'] = dfd[sec_axis].apply(lambda y: assign_column(y, headers))
     
     else:
         # NEW FORMAT: T and S appear within each lap block as row-level separators
@@ -161,39 +290,48 @@ def clean_section_results_page(dfp, st):
         dfd = dfb.loc[dfb.cell_type.isin(('Time','Speed'))].copy()
         
         # expand rows where the PDF parser merged multiple values into one cell
-        multi = dfd.data.str.match(r'^\d+\.?\d* \d', na=False)
-        if multi.any():
-            expanded = []
-            for _, row in dfd.loc[multi].iterrows():
-                vals = row.data.split()
-                n = len(vals)
-                for i, v in enumerate(vals):
-                    r = row.copy()
-                    r['data'] = v
-                    r['bbox_x0'] = row.bbox_x0 + i * (row.bbox_x1 - row.bbox_x0) / n
-                    r['bbox_x1'] = row.bbox_x0 + (i+1) * (row.bbox_x1 - row.bbox_x0) / n
-                    expanded.append(r)
-            dfd = pd.concat([dfd.loc[~multi], pd.DataFrame(expanded)]).sort_values(['block','line'])
+        if engine == 'numpy':
+            dfd = split_merged_cells(dfd)
+        else:
+            multi = dfd.data.str.match(r'^\d+\.?\d* \d', na=False)
+            if multi.any():
+                expanded = []
+                for _, row in dfd.loc[multi].iterrows():
+                    vals = row.data.split()
+                    n = len(vals)
+                    for i, v in enumerate(vals):
+                        r = row.copy()
+                        r['data'] = v
+                        r['bbox_x0'] = row.bbox_x0 + i * (row.bbox_x1 - row.bbox_x0) / n
+                        r['bbox_x1'] = row.bbox_x0 + (i+1) * (row.bbox_x1 - row.bbox_x0) / n
+                        expanded.append(r)
+                dfd = pd.concat([dfd.loc[~multi], pd.DataFrame(expanded)]).sort_values(['block','line'])
         
         # add headers
         l_to_r = is_left_to_right(dfb.loc[dfb.block == dfb.block.min()])  
-        dfh = dfp.loc[dfp.block < dfb.block.min()].copy()
-        headers = get_header_coords(dfh, st, dfd.bbox_x0.min(), dfd.bbox_x1.max(), l_to_r)
-        dfd['Section'] = dfd[f'bbox_x{0 if l_to_r else 1}'].apply(lambda x: assign_column(x, headers))
+        dfh = dfp.loc[dfp.block < dfb.block.min()]
+        headers = layout.header_coords(dfh, st, dfd.bbox_x0.min(), dfd.bbox_x1.max(), l_to_r)
+        if engine == 'numpy':
+            dfd['Section'] = assign_columns(dfd[f'bbox_x{0 if l_to_r else 1}'], headers)
+        else:
+            dfd['Section'] = dfd[f'bbox_x{0 if l_to_r else 1}'].apply(lambda x: assign_column(x, headers))
     
     # add car and driver info
     dfd['Car'] = car
     dfd['Driver'] = driver
     
     # add flags based on nearest-color match to fill mapping
-    df_fill = get_fill_mapping()
-    fill_arr = np.array(list(df_fill['fill']))
-    dfd = dfd.loc[dfd.fill.apply(bool)].copy()  # drop rows with no fill color
-    dfd['fill'] = dfd.fill.apply(lambda x: tuple(x))
-    dfd['Flag'] = dfd['fill'].apply(lambda x: df_fill['Flag'].iloc[np.argmin(((fill_arr - x)**2).sum(axis=1))])
+    dfd = dfd.loc[dfd.fill >= 0].copy()  # drop rows with no fill color
+    if engine == 'numpy':
+        dfd['Flag'] = get_flags(dfd.fill)
+    else:
+        df_fill = get_fill_mapping()
+        fill_arr = np.array(list(df_fill['fill']))
+        dfd['Flag'] = [df_fill['Flag'].iloc[np.argmin(((fill_arr - x)**2).sum(axis=1))]
+                       for x in unpack_fills(dfd.fill)]
     
-    # clean and reshape data
-    dfd['data'] = pd.to_numeric(dfd.data, errors='coerce')
+    # clean and reshape data (via object so string-dtype text still yields plain float64)
+    dfd['data'] = pd.to_numeric(dfd.data.astype(object), errors='coerce')
     dfd = dfd.dropna(subset=['data'])  # drop rows with un-parseable values (PDF merge artifacts)
     dfd['Lap'] = dfd.Lap.astype(int)
     dfd = dfd.drop_duplicates(subset=['Car','Driver','Lap','Section','Flag','cell_type'])
@@ -207,6 +345,7 @@ def clean_section_results_page(dfp, st):
     return dffinal
         
 def parse_results_pdf(file):
+    import camelot
     tables = camelot.read_pdf(file, pages="1", flavor="stream")  
     for t in tables:
         if (t.df.iloc[:-1] == 'Pos').max().max(): # header can bleed into last row of another table
@@ -1,89 +1,119 @@
-import fitz
 import os
-import pandas as pd
 import logging
-from indycar_analytics.util.pdf_utils import parse_file
-from .cleaning import clean_section_results_page, parse_sections_table
 import time
 from datetime import datetime
-from google.cloud import storage
-from google.oauth2 import service_account
-
-# set up GCS
-credentials_path = os.getenv(
-    "GOOGLE_APPLICATION_CREDENTIALS",
-    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "dbt-service-account-credentials.json"))
-)
-credentials = service_account.Credentials.from_service_account_file(credentials_path)
-client = storage.Client(credentials=credentials, project=credentials.project_id)
-bucket = client.bucket("motorstats-clean-pq")
-
-# Set up logger
-suffix = datetime.now().strftime('%Y%m%d%H%M%S')
+from indycar_analytics.util.storage import get_storage
+from indycar_analytics.util.manifest import BlobManifest
+from indycar_analytics.util.batch import run_batch
+from indycar_analytics.util.schemas import to_parquet_bytes
+from indycar_analytics.util.stamps import source_stamp
+
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
-# File handler - captures all DEBUG and above
-file_handler = logging.FileHandler(f'./data/logs/section_parser-{suffix}.log', mode='a')
-file_handler.setLevel(logging.DEBUG)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+# bump when a change to cleaning.py changes the output, util.reprocess then rebuilds every file
+PARSER_VERSION = 1
+
+def setup_logger():
+    """Attach the log file and console handlers on first use rather than at import."""
+    if logger.handlers:
+        return logger
+
+    suffix = datetime.now().strftime('%Y%m%d%H%M%S')
+    logger.setLevel(logging.DEBUG)
+
+    # File handler - captures all DEBUG and above
+    file_handler = logging.FileHandler(f'./data/logs/section_parser-{suffix}.log', mode='a')
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
 
-# Stream handler - captures INFO and above (console output)
-stream_handler = logging.StreamHandler()
-stream_handler.setLevel(logging.INFO)
-stream_handler.setFormatter(logging.Formatter('%(levelname)s - %(message)s'))
+    # Stream handler - captures INFO and above (console output)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setLevel(logging.INFO)
+    stream_handler.setFormatter(logging.Formatter('%(levelname)s - %(message)s'))
 
-logger.addHandler(file_handler)
-logger.addHandler(stream_handler)
+    logger.addHandler(file_handler)
+    logger.addHandler(stream_handler)
+    return logger
    
-def parse_and_clean_section_results(files):
-    failed_files = []
+def section_results_object_path(file):
+    return f"sectionresults/{file.replace('.pdf', '.pq')}"
+
+def parse_section_results_file(file, page_workers=None, use_cache=True, lazy=True):
+    """(object name, parquet bytes, stamp) for one section results PDF, None when no rows were parsed."""
+    # heavy parsing dependencies are only loaded once there is work to do
+    import fitz
+    import pandas as pd
+    from indycar_analytics.util.pdf_utils import parse_file, extract_spans, iter_pages, SPANS_EXTRACT_VERSION
+    from indycar_analytics.util.extract_cache import cached_extract
+    from .cleaning import clean_section_results_page, parse_sections_table, classify_section_page, SectionLayout
+
+    # no-op in the parent; gives process-pool workers their own handlers
+    setup_logger()
+    start = time.perf_counter()
+    logger.debug(f'Parsing and cleaning {file}')
+    path = os.path.join('data', 'pdfs', 'sectionresults', file)
+    page_filter = classify_section_page if lazy else None
+    if use_cache:
+        extractor = 'sectionresults-lazy' if lazy else 'sectionresults'
+        df = cached_extract(path, extractor, SPANS_EXTRACT_VERSION, ('spans',),
+                            lambda p: extract_spans(p, page_workers, page_filter))['spans']
+    else:
+        doc = fitz.open(path)
+        df = parse_file(doc, columnar=True, workers=page_workers, page_filter=page_filter)
+
+    st = parse_sections_table(df)
+    layout = SectionLayout(st)
+
+    dfps = []
+    for p, dfp in iter_pages(df):
+        page_result = clean_section_results_page(dfp, st, layout=layout)
+        if page_result.empty:
+            logger.debug(f'Skipping page {p} in {file} - does not contain Section Data')
+        else:
+            dfps.append(page_result)
+    logger.debug(f'Header layout reused on {layout.hits} pages, resolved on {layout.misses}')
+
+    if not dfps:
+        return None
+
+    dfclean = pd.concat(dfps)
+    stamp = source_stamp(path, 'sectionresults', PARSER_VERSION)
+    data = to_parquet_bytes(dfclean, 'sectionresults', stamp)
+    logger.debug(f'PDF->Parquet time: {time.perf_counter() - start:.2f}s')
+    return section_results_object_path(file), data, stamp
+
+def parse_and_clean_section_results(files, page_workers=None, use_cache=True, lazy=True, manifest_ttl=None, upload_workers=4, storage=None, workers=None, chunksize=1):
+    """Parse section results PDFs and upload one parquet file per PDF.
+
+    workers > 1 parses whole files in a process pool; leave page_workers unset then.
+    """
+    setup_logger()
+    storage = storage or get_storage()
 
     # if files is 'All', get the list of all files
     if type(files) == str:
         if files.lower() == 'all':
             files = os.listdir("data/pdfs/sectionresults/")
         
+    # one listing of the destination prefix instead of an exists() call per file
+    manifest = BlobManifest(storage, 'sectionresults/', ttl=manifest_ttl)
+
+    todo = []
     for file in files:
-        parquetfile = file.replace('.pdf', '.pq')
-        gcs_object_path = f"sectionresults/{parquetfile}"
-
-        try:
-            if bucket.blob(gcs_object_path).exists():
-                logger.info(f"Skipping existing GCS object: gs://motorstats-clean-pq/{gcs_object_path}")
-                continue
-
-            start = time.perf_counter()
-            logger.debug(f'Parsing and cleaning {file}')
-            doc = fitz.open(os.path.join('data', 'pdfs', 'sectionresults', file))
-            allrows = parse_file(doc)
-            df = pd.DataFrame(allrows)
-
-            st = parse_sections_table(df)
-
-            dfps = []
-            for p in df.page.unique():
-                dfp = df.loc[df.page == p].copy()
-                page_result = clean_section_results_page(dfp, st)
-                if page_result.empty:
-                    logger.debug(f'Skipping page {p} in {file} - does not contain Section Data')
-                else:
-                    dfps.append(page_result)
-
-            if not dfps:
-                logger.warning(f'No section result rows parsed for {file}')
-                continue
-
-            dfclean = pd.concat(dfps)
-            blob = bucket.blob(gcs_object_path)
-            blob.upload_from_string(data=dfclean.to_parquet(index=False), content_type="application/octet-stream")
-            logger.debug(f'PDF->Parquet time: {time.perf_counter() - start:.2f}s')
-            logger.info(f'SUCCESS: {file}')
-        except Exception as e:
-            failed_files.append(file)
-            logger.warning(f'FAILED PDF->Parquet: {file} | {e}')
-
-    if failed_files:
-        logger.info('Failed files:')
-        for f in failed_files:
-            logger.info(f'- {f}')
+        gcs_object_path = section_results_object_path(file)
+        if manifest.exists(gcs_object_path):
+            logger.info(f"Skipping existing object: {storage.uri(gcs_object_path)}")
+            continue
+        todo.append(file)
+
+    # parse in a process pool when workers > 1; the summary keeps the order of todo
+    summary = run_batch(parse_section_results_file, todo, storage, workers=workers, chunksize=chunksize,
+                        upload_workers=upload_workers, page_workers=page_workers, use_cache=use_cache, lazy=lazy)
+    for file in summary.empty:
+        logger.warning(f'No section result rows parsed for {file}')
+    for file, name in summary.uploaded:
+        manifest.add(name)
+        logger.info(f'SUCCESS: {file}')
+    for file, error in summary.failed:
+        logger.warning(f'FAILED PDF->Parquet: {file} | {error}')
+    summary.report(logger.info)
@@ -0,0 +1,105 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from .uploader import BackgroundUploader, upload_with_retry
+
+# set once per worker process by _init_worker
+_storage = None
+
+
+def _init_worker(storage):
+    # each worker unpickles its own copy; a GCS client is only built on the worker's first write
+    global _storage
+    _storage = storage
+
+def _run_file(fn, kwargs, file):
+    try:
+        result = fn(file, **kwargs)
+        if result is None:
+            return file, 'empty', None
+        name, data, metadata = result
+    except Exception as e:
+        return file, 'failed', f'{type(e).__name__}: {e}'
+    try:
+        # same retries as the serial path's BackgroundUploader
+        upload_with_retry(_storage, name, data, metadata=metadata)
+        return file, 'uploaded', name
+    except Exception as e:
+        return file, 'failed', f'upload {type(e).__name__}: {e}'
+
+
+class BatchSummary:
+    """Per-file outcomes of run_batch, in the order the files were given.
+
+    results is [(file, status, detail)]. status is 'uploaded' (detail is the object
+    name), 'empty' (nothing parsed) or 'failed' (detail is the error).
+    """
+
+    def __init__(self, results):
+        self.results = results
+
+    def _with_status(self, status):
+        return [(file, detail) for file, s, detail in self.results if s == status]
+
+    @property
+    def uploaded(self):
+        return self._with_status('uploaded')
+
+    @property
+    def empty(self):
+        return [file for file, _ in self._with_status('empty')]
+
+    @property
+    def failed(self):
+        return self._with_status('failed')
+
+    def report(self, log=print):
+        log(f"{len(self.uploaded)} uploaded, {len(self.empty)} empty, {len(self.failed)} failed")
+        for file, error in self.failed:
+            log(f"- {file}: {error}")
+
+
+def _run_serial(fn, files, storage, upload_workers, kwargs):
+    results = [None] * len(files)
+    uploader = BackgroundUploader(max_workers=upload_workers)
+    for i, file in enumerate(files):
+        try:
+            result = fn(file, **kwargs)
+        except Exception as e:
+            results[i] = (file, 'failed', f'{type(e).__name__}: {e}')
+            continue
+        if result is None:
+            results[i] = (file, 'empty', None)
+        else:
+            # upload in the background and keep parsing
+            name, data, metadata = result
+            uploader.submit(storage, name, data, key=i, metadata=metadata)
+
+    uploaded, failed = uploader.flush()
+    uploader.close()
+    for i, name in uploaded:
+        results[i] = (files[i], 'uploaded', name)
+    for i, name, e in failed:
+        results[i] = (files[i], 'failed', f'upload {type(e).__name__}: {e}')
+    return BatchSummary(results)
+
+def run_batch(fn, files, storage, workers=None, chunksize=1, upload_workers=4, **kwargs):
+    """Run fn(file, **kwargs) for every file and upload what it returns.
+
+    fn must be a module-level function returning (object name, parquet bytes, object
+    metadata such as the util.stamps stamp), or None
+    when the file has nothing to write; exceptions are recorded as failures of that file.
+    With workers > 1 files are parsed in a process pool, chunksize files per task, and
+    uploaded from the workers, each with its own copy of storage. The workers are spawned,
+    not forked, so none inherits a client (and its sockets) storage already built here.
+    Otherwise they are parsed here with uploads on a BackgroundUploader. Either way the
+    summary lists the files in the order given, whatever order they finished in.
+    """
+    files = list(files)
+    if not workers or workers < 2 or len(files) < 2:
+        return _run_serial(fn, files, storage, upload_workers, kwargs)
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(storage,)) as pool:
+        results = list(pool.map(partial(_run_file, fn, kwargs), files, chunksize=chunksize))
+    return BatchSummary(results)
@@ -1,29 +1,31 @@
+import base64
+import json
 import os
-import pandas as pd
-from google.cloud import storage
-from google.oauth2 import service_account
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
+from indycar_analytics.util.storage import get_storage
+from indycar_analytics.util.schemas import CLOSED, registered_schema, as_category, is_color
 
-# Set up GCS
-credentials_path = os.getenv(
-    "GOOGLE_APPLICATION_CREDENTIALS",
-    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "dbt-service-account-credentials.json"))
-)
-credentials = service_account.Credentials.from_service_account_file(credentials_path)
-client = storage.Client(credentials=credentials, project=credentials.project_id)
-bucket = client.bucket("motorstats-clean-pq")
+BUILD_STATE_SUFFIX = '.sources.json'
+# bump when conform_table converts sources differently; builds by another version are redone in full
+BUILD_VERSION = 2
 
 
-def concat_prefix(gcs_prefix, output_path):
+def concat_prefix(gcs_prefix, output_path, storage=None):
     """Download all .pq blobs under gcs_prefix, concatenate, and upload to output_path."""
-    blobs = list(bucket.list_blobs(prefix=gcs_prefix))
+    import pandas as pd
+
+    storage = storage or get_storage()
+    names = storage.list(gcs_prefix)
     dfs = []
-    for blob in blobs:
-        if blob.name.endswith('.pq'):
-            df = pd.read_parquet(BytesIO(blob.download_as_bytes()))
+    for name in names:
+        if name.endswith('.pq'):
+            df = pd.read_parquet(BytesIO(storage.read(name)))
             dfs.append(df)
         else:
-            print(f"Skipping non-parquet file: {blob.name}")
+            print(f"Skipping non-parquet file: {name}")
 
     if not dfs:
         print(f"No parquet files found under {gcs_prefix}")
@@ -36,21 +38,274 @@ def concat_prefix(gcs_prefix, output_path):
     dfall.columns = [c.replace('.', '_') for c in dfall.columns]
 
     print(f"{gcs_prefix} -> {output_path}  rows={len(dfall)}  cols={list(dfall.columns)}")
-    bucket.blob(output_path).upload_from_string(
-        data=dfall.to_parquet(index=False), content_type="application/octet-stream"
-    )
+    storage.write(output_path, dfall.to_parquet(index=False))
 
-if __name__ == '__main__':
-    for report_type, source_type, session_type in [
-        ("results","PDF", "Race"),
-        ("results","PDF", "Qualifying"),
-        ("results","PDF", "Practice"),
-        ("results","HTML", "Race"),
-        ("results","HTML", "Qualifying"),
-        ("results","HTML", "Practice"),
-        ("lapcharts","","Race")
-    ]:
-        concat_prefix(
-            gcs_prefix="/".join([x for x in (report_type,source_type,session_type) if x != ""]),
+def unify_schemas(schemas):
+    """One Arrow schema covering every input file, mirroring what pd.concat + astype(string) produced.
+
+    Columns keep their first-seen order. A column whose type differs between files
+    becomes int64 if every version is an integer, float64 if every version is numeric,
+    otherwise string. Object/null columns
+    become string, and '.' in column names becomes '_'.
+    """
+    import pyarrow as pa
+
+    types = {}
+    for schema in schemas:
+        for field in schema:
+            if field.name.startswith('__index_level_'):
+                continue  # pandas index, dropped like reset_index(drop=True) did
+            if pa.types.is_null(field.type):
+                types.setdefault(field.name, set())
+            else:
+                types.setdefault(field.name, set()).add(field.type)
+
+    fields = []
+    for name, seen in types.items():
+        if len(seen) == 1:
+            (t,) = seen
+        elif seen and all(pa.types.is_integer(t) for t in seen):
+            t = pa.int64()
+        elif seen and all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in seen):
+            t = pa.float64()
+        else:
+            t = pa.string()
+        if pa.types.is_large_string(t) or not seen:
+            t = pa.string()
+        fields.append(pa.field(name, t))
+    return pa.schema(fields)
+
+def conform_table(table, schema):
+    """Cast table to schema, filling columns the table lacks with nulls."""
+    import pyarrow as pa
+
+    columns = []
+    for field in schema:
+        if field.name not in table.column_names:
+            columns.append(pa.nulls(len(table), type=field.type))
+            continue
+        column = table.column(field.name)
+        if is_color(field):
+            # fills may be tuples, "r,g,b" strings or '#rrggbb' depending on when the source was written
+            column = as_category(column, color=True)
+        elif column.type != field.type and pa.types.is_dictionary(field.type):
+            # outputs written before the schema registry hold plain strings / fill tuples
+            column = as_category(column)
+        columns.append(column.cast(field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+def build_schema(report, footers):
+    """Output schema for a build; footers() returns the source schemas and is only called when needed.
+
+    Closed reports use their registered schema as is. Other reports get their registered
+    columns followed by the unified unregistered ones, and without a report everything is unified.
+    """
+    if report in CLOSED:
+        return registered_schema(report)
+    schema = unify_schemas(footers())
+    return schema if report is None else registered_schema(report, schema)
+
+def list_sources(storage, gcs_prefix):
+    """{name: {'generation', 'md5'}} for the .pq objects under gcs_prefix."""
+    sources = {}
+    for name, version in storage.list_versions(gcs_prefix).items():
+        if name.endswith('.pq'):
+            sources[name] = version
+        else:
+            print(f"Skipping non-parquet file: {name}")
+    return sources
+
+def build_state_path(output_path):
+    return output_path + BUILD_STATE_SUFFIX
+
+def output_version(storage, output_path):
+    """{'generation', 'md5'} of the combined file as stored now, or None if there is none."""
+    return storage.list_versions(output_path).get(output_path)
+
+def load_build_state(storage, output_path):
+    """Sources (in row order), their versions and row counts, and the schema a combined file was built from.
+
+    None when the combined file is not the one the state was saved for: the output is
+    uploaded before its state, so a crash in between leaves a new file with the old
+    state, and appending to it from that state would duplicate rows.
+    """
+    import pyarrow as pa
+
+    path = build_state_path(output_path)
+    if not storage.exists(path):
+        return None
+    state = json.loads(storage.read(path))
+    output = output_version(storage, output_path)
+    if output is None or state.get('output') != output:
+        if output is not None:
+            print(f"{output_path}: does not match its build state, rebuilding from scratch")
+        return None
+    state['schema'] = pa.ipc.read_schema(pa.py_buffer(base64.b64decode(state['schema'])))
+    return state
+
+def save_build_state(storage, output_path, schema, sources):
+    """Record what output_path was just built from, along with the generation it was uploaded as."""
+    state = {
+        'version': BUILD_VERSION,
+        'schema': base64.b64encode(schema.serialize().to_pybytes()).decode('ascii'),
+        'sources': sources,
+        'output': output_version(storage, output_path),
+    }
+    storage.write(build_state_path(output_path), json.dumps(state, indent=1), content_type="application/json")
+
+def plan_incremental(state, sources):
+    """(kept, changed, added) source names, or None when a full rebuild is needed.
+
+    A rebuild is needed when there is no previous build, it was made by another
+    BUILD_VERSION, or a source was deleted.
+    Changed sources (new generation or md5) have their old rows dropped and are appended again.
+    """
+    if state is None or state.get('version') != BUILD_VERSION:
+        return None
+    built = [s['name'] for s in state['sources']]
+    if any(name not in sources for name in built):
+        return None
+    versions = {s['name']: (s['generation'], s['md5']) for s in state['sources']}
+    changed = [n for n in built if versions[n] != (sources[n]['generation'], sources[n]['md5'])]
+    kept = [n for n in built if n not in changed]
+    added = [n for n in sources if n not in versions]
+    return kept, changed, added
+
+def kept_slices(offset, length, drop_ranges):
+    """(start, length) pieces of rows offset..offset+length that fall outside every drop range."""
+    pieces, pos, end = [], offset, offset + length
+    for lo, hi in drop_ranges:
+        if hi <= pos or lo >= end:
+            continue
+        if lo > pos:
+            pieces.append((pos - offset, lo - pos))
+        pos = max(pos, hi)
+    if pos < end:
+        pieces.append((pos - offset, end - pos))
+    return pieces
+
+def download_all(storage, names, tmpdir, workers):
+    paths = [os.path.join(tmpdir, f'{i}.pq') for i in range(len(names))]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(storage.read_to_file, names, paths))
+    return paths
+
+def concat_prefix_streaming(gcs_prefix, output_path, storage=None, workers=8, schema=None, incremental=False, report=None):
+    """concat_prefix with flat memory use.
+
+    Source files are downloaded in parallel to a temp directory. The output schema is the
+    given Arrow schema, else the registered schema of report (see util.schemas), else the
+    unified schema of the sources. Each file is then cast and appended as its
+    own row groups to a ParquetWriter on a temp file. The finished file is uploaded with
+    a resumable upload. Only one source table is held in memory at a time.
+
+    Every build records which source objects (name, generation, md5) went into the output
+    in a `<output_path>.sources.json` sidecar. With incremental=True the previous output
+    is copied forward and only new or changed sources are downloaded and appended. A full
+    rebuild happens only if a source was deleted, the schema changed, or the output is not
+    the one the sidecar was saved for.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    storage = storage or get_storage()
+    sources = list_sources(storage, gcs_prefix)
+    if not sources:
+        print(f"No parquet files found under {gcs_prefix}")
+        return
+
+    state = load_build_state(storage, output_path) if incremental else None
+    plan = plan_incremental(state, sources)
+    if incremental and plan is None:
+        print(f"{output_path}: no usable previous build, rebuilding from scratch")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if plan is not None:
+            kept, changed, added = plan
+            if not changed and not added:
+                print(f"{output_path} is up to date ({len(kept)} sources)")
+                return
+            new_names = changed + added
+        else:
+            new_names = list(sources)
+        paths = download_all(storage, new_names, tmpdir, workers)
+
+        # footers only, so this doesn't load any row data
+        def footers():
+            schemas = [pq.read_schema(p).remove_metadata() for p in paths]
+            return ([state['schema']] if plan is not None else []) + schemas
+
+        new_schema = schema or build_schema(report, footers)
+        if plan is not None and not new_schema.equals(state['schema']):
+            print(f"{output_path}: schema changed, rebuilding from scratch")
+            plan = None
+            new_names = list(sources)
+            paths = download_all(storage, new_names, tmpdir, workers)
+            if schema is None:
+                new_schema = build_schema(report, footers)
+        schema = new_schema
+        out_schema = pa.schema([f.with_name(f.name.replace('.', '_')) for f in schema])
+
+        out_path = os.path.join(tmpdir, 'combined.pq')
+        built, rows = [], 0
+        with pq.ParquetWriter(out_path, out_schema) as writer:
+            if plan is not None:
+                # copy the previous output forward batch by batch, minus the rows of changed sources
+                drop, offset = [], 0
+                for s in state['sources']:
+                    if s['name'] in changed:
+                        drop.append((offset, offset + s['rows']))
+                    else:
+                        built.append(s)
+                    offset += s['rows']
+                previous = os.path.join(tmpdir, 'previous.pq')
+                storage.read_to_file(output_path, previous)
+                offset = 0
+                for batch in pq.ParquetFile(previous).iter_batches():
+                    pieces = [batch.slice(start, length) for start, length in kept_slices(offset, len(batch), drop)]
+                    if pieces:
+                        table = pa.Table.from_batches(pieces).cast(out_schema)
+                        writer.write_table(table)
+                        rows += len(table)
+                    offset += len(batch)
+                os.remove(previous)
+
+            for name, p in zip(new_names, paths):
+                table = conform_table(pq.read_table(p), schema).rename_columns(out_schema.names)
+                writer.write_table(table)
+                rows += len(table)
+                built.append({'name': name, **sources[name], 'rows': len(table)})
+                os.remove(p)
+
+        mode = 'full' if plan is None else f'+{len(new_names)} sources'
+        print(f"{gcs_prefix} -> {output_path}  rows={rows}  cols={out_schema.names}  ({mode})")
+        storage.write_file(output_path, out_path)
+        save_build_state(storage, output_path, schema, built)
+
+# (report type, source type, session type, util.schemas report)
+COMBINED_OUTPUTS = [
+    ("results","PDF", "Race", "results"),
+    ("results","PDF", "Qualifying", "results"),
+    ("results","PDF", "Practice", "results"),
+    ("results","HTML", "Race", "html_results"),
+    ("results","HTML", "Qualifying", "html_results"),
+    ("results","HTML", "Practice", "html_results"),
+    ("lapcharts","","Race", "lapcharts")
+]
+
+def build_combined(incremental=True, prefixes=None, storage=None):
+    """Build the combined_*.pq outputs, only those whose source prefix is in prefixes if given."""
+    for report_type, source_type, session_type, report in COMBINED_OUTPUTS:
+        gcs_prefix = "/".join([x for x in (report_type,source_type,session_type) if x != ""])
+        if prefixes is not None and gcs_prefix not in prefixes:
+            continue
+        concat_prefix_streaming(
+            gcs_prefix=gcs_prefix,
             output_path=f"{report_type}/combined_{source_type if source_type != '' else report_type}_{session_type}.pq",
+            storage=storage,
+            incremental=incremental,
+            report=report,
         )
+
+if __name__ == '__main__':
+    build_combined(incremental='--full' not in sys.argv)
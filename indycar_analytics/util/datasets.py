@@ -0,0 +1,162 @@
+import base64
+import json
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from indycar_analytics.util.storage import get_storage
+from indycar_analytics.util.session_routing import get_session_prefix
+from indycar_analytics.util.concat_gcs_parquets import list_sources, build_schema, conform_table, BUILD_VERSION
+
+# (source prefix, dataset prefix, index of the race token in the file name, util.schemas report)
+DATASETS = [
+    ('results/PDF/', 'results/dataset_PDF', 2, 'results'),
+    ('results/HTML/', 'results/dataset_HTML', 1, 'html_results'),
+    ('lapcharts/Race/', 'lapcharts/dataset', 2, 'lapcharts'),
+    ('sectionresults/', 'sectionresults/dataset', 2, 'sectionresults'),
+]
+
+PARTITION_KEYS = ('series', 'season', 'session_type')
+SERIES_TAGS = ('indynxt',)
+DEFAULT_SERIES = 'indycar'
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+STATE_NAME = '_sources.json'  # '_' prefix keeps pyarrow dataset discovery from reading it
+
+
+def partition_values(name, race_token_index):
+    """{series, season, session_type, race} for a source object name.
+
+    Names follow the scraper's 'date;[race_id;]race;session;report[;series].pq'.
+    Older names without a date get a null season.
+    """
+    file = name.rsplit('/', 1)[-1][:-len('.pq')]
+    tokens = file.split(';')
+    year = re.match(r'(19|20)\d\d', tokens[0]) or re.search(r'(19|20)\d\d', file)
+    race = tokens[race_token_index] if len(tokens) > race_token_index else file
+    return {
+        'series': tokens[-1] if tokens[-1] in SERIES_TAGS else DEFAULT_SERIES,
+        'season': year.group(0) if year else NULL_PARTITION,
+        'session_type': get_session_prefix(file, race_token_index + 1, race_token_index),
+        'race': race.replace('_', ' ').strip(),
+    }
+
+def partition_path(values):
+    return '/'.join(f'{k}={values[k]}' for k in PARTITION_KEYS)
+
+def load_state(storage, dataset_prefix):
+    import pyarrow as pa
+
+    path = f'{dataset_prefix}/{STATE_NAME}'
+    if not storage.exists(path):
+        return None
+    state = json.loads(storage.read(path))
+    state['schema'] = pa.ipc.read_schema(pa.py_buffer(base64.b64decode(state['schema'])))
+    return state
+
+def save_state(storage, dataset_prefix, schema, partitions):
+    state = {
+        'version': BUILD_VERSION,
+        'schema': base64.b64encode(schema.serialize().to_pybytes()).decode('ascii'),
+        'partitions': partitions,
+    }
+    storage.write(f'{dataset_prefix}/{STATE_NAME}', json.dumps(state, indent=1), content_type="application/json")
+
+def write_partitioned_dataset(gcs_prefix, dataset_prefix, race_token_index, storage=None, workers=8, schema=None, full=False, report=None):
+    """Write the sources under gcs_prefix as a Hive-partitioned dataset under dataset_prefix.
+
+    Layout is dataset_prefix/series=.../season=.../session_type=.../part-0.pq. Within a
+    partition the sources are written in name (i.e. date) order, one row group per source,
+    with a 'race' column added. The row group statistics on race then let readers skip
+    whole races as well as whole partitions. Every partition shares one schema, built as in
+    concat_prefix_streaming.
+
+    Only partitions whose set of sources (name, generation, md5) changed are rewritten,
+    unless full=True or the schema changed. Partitions whose sources all disappeared are deleted.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    storage = storage or get_storage()
+    sources = list_sources(storage, gcs_prefix)
+    sources = {n: v for n, v in sources.items() if not n.startswith(dataset_prefix + '/')}
+    if not sources:
+        print(f"No parquet files found under {gcs_prefix}")
+        return
+
+    partitions = {}
+    for name in sorted(sources):
+        values = partition_values(name, race_token_index)
+        partitions.setdefault(partition_path(values), {})[name] = {**sources[name], 'race': values['race']}
+
+    state = None if full else load_state(storage, dataset_prefix)
+
+    with tempfile.TemporaryDirectory() as tmpdir, ThreadPoolExecutor(max_workers=workers) as pool:
+        def download(names):
+            paths = [os.path.join(tmpdir, f'{i}.pq') for i in range(len(names))]
+            list(pool.map(storage.read_to_file, names, paths))
+            return paths
+
+        def read_schema(name):
+            # reads just the footer over the Arrow filesystem, no row data is transferred
+            filesystem, path = storage.arrow_path(name)
+            return pq.read_schema(path, filesystem=filesystem).remove_metadata()
+
+        def read_schemas(names):
+            return list(pool.map(read_schema, names))
+
+        previous = state['partitions'] if state is not None else {}
+        changed = [path for path, part in partitions.items() if previous.get(path) != part]
+        given = schema
+        if given is None and state is not None:
+            # footers of the changed partitions' sources; unchanged ones were covered by the stored schema
+            names = [n for path in changed for n in partitions[path]]
+            schema = build_schema(report, lambda: [state['schema']] + read_schemas(names))
+        if state is None or state.get('version') != BUILD_VERSION or not schema.equals(state['schema']):
+            if state is not None:
+                print(f"{dataset_prefix}: schema or build version changed, rewriting every partition")
+            if given is None:
+                schema = build_schema(report, lambda: read_schemas(list(sources)))
+            changed = list(partitions)
+
+        out_schema = pa.schema([f.with_name(f.name.replace('.', '_')) for f in schema])
+        if 'race' not in out_schema.names:
+            out_schema = out_schema.append(pa.field('race', pa.string()))
+
+        for path in changed:
+            part = partitions[path]
+            names = list(part)
+            paths = download(names)
+            out_path = os.path.join(tmpdir, 'part.pq')
+            with pq.ParquetWriter(out_path, out_schema) as writer:
+                for name, p in zip(names, paths):
+                    table = conform_table(pq.read_table(p), schema).rename_columns(
+                        [f.name.replace('.', '_') for f in schema])
+                    if 'race' not in schema.names:
+                        table = table.append_column('race', pa.array([part[name]['race']] * len(table), pa.string()))
+                    writer.write_table(table)
+                    os.remove(p)
+            storage.write_file(f'{dataset_prefix}/{path}/part-0.pq', out_path)
+
+        for path in previous:
+            if path not in partitions:
+                storage.delete(f'{dataset_prefix}/{path}/part-0.pq')
+
+    print(f"{gcs_prefix} -> {dataset_prefix}  partitions={len(partitions)}  rewritten={len(changed)}")
+    save_state(storage, dataset_prefix, schema, partitions)
+
+def read_dataset(dataset_prefix, filters=None, columns=None, storage=None):
+    """Read a partitioned dataset into a DataFrame, pruning partitions and row groups with filters.
+
+    filters use pyarrow's DNF form, e.g. [('season', '=', 2023), ('race', '=', 'Indianapolis 500')].
+    """
+    import pyarrow.parquet as pq
+
+    storage = storage or get_storage()
+    filesystem, path = storage.arrow_path(dataset_prefix)
+    table = pq.read_table(path, filesystem=filesystem, filters=filters, columns=columns, partitioning='hive')
+    return table.to_pandas()
+
+
+if __name__ == '__main__':
+    for gcs_prefix, dataset_prefix, race_token_index, report in DATASETS:
+        write_partitioned_dataset(gcs_prefix, dataset_prefix, race_token_index, report=report)
@@ -0,0 +1,36 @@
+import os
+import pandas as pd
+from .stamps import file_hash
+
+# raw extraction results live next to the source pdfs, one folder per extractor
+CACHE_DIR = os.path.join('data', 'cache', 'extract')
+
+
+def cache_paths(content_hash, extractor, version, tables, cache_dir=CACHE_DIR):
+    return {
+        t: os.path.join(cache_dir, extractor, f'{content_hash}-v{version}.{t}.pq')
+        for t in tables
+    }
+
+
+def cached_extract(path, extractor, version, tables, extract, cache_dir=CACHE_DIR):
+    """Return the raw extraction tables for the file at path, calling extract(path) only on a miss.
+
+    Entries are keyed by the file's content hash plus the extractor name and version,
+    so renamed or re-downloaded copies of the same PDF share an entry and bumping the
+    extractor version invalidates everything it wrote. extract must return a dict of
+    DataFrames with (at least) the given table names; each is stored as its own Parquet file.
+    """
+    paths = cache_paths(file_hash(path), extractor, version, tables, cache_dir)
+    if all(os.path.exists(p) for p in paths.values()):
+        return {t: pd.read_parquet(p) for t, p in paths.items()}
+
+    result = extract(path)
+    os.makedirs(os.path.join(cache_dir, extractor), exist_ok=True)
+    for t, p in paths.items():
+        # write then rename so an interrupted run never leaves a partial entry behind
+        tmp = f'{p}.{os.getpid()}.tmp'
+        result[t].to_parquet(tmp, index=False)
+        os.replace(tmp, p)
+
+    return result
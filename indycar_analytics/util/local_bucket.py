@@ -0,0 +1,118 @@
+import json
+import os
+import shutil
+
+METADATA_DIR = '.metadata'  # custom object metadata, kept out of listings
+
+
+class LocalBlob:
+    """Filesystem stand-in for a google.cloud.storage Blob (the subset this repo uses)."""
+
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self._metadata = None
+
+    @property
+    def path(self):
+        return os.path.join(self.bucket.root, *self.name.split('/'))
+
+    @property
+    def metadata_path(self):
+        return os.path.join(self.bucket.root, METADATA_DIR, *self.name.split('/')) + '.json'
+
+    @property
+    def metadata(self):
+        # like a GCS blob: what was set for the next upload, else what the stored object has
+        if self._metadata is not None:
+            return self._metadata
+        if not os.path.isfile(self.metadata_path):
+            return None
+        with open(self.metadata_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @metadata.setter
+    def metadata(self, value):
+        self._metadata = value
+
+    def _write_metadata(self):
+        # an overwrite replaces the object's metadata, as a new GCS generation would
+        if self._metadata:
+            os.makedirs(os.path.dirname(self.metadata_path), exist_ok=True)
+            with open(self.metadata_path, 'w', encoding='utf-8') as f:
+                json.dump(self._metadata, f)
+        elif os.path.isfile(self.metadata_path):
+            os.remove(self.metadata_path)
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path) if self.exists() else None
+
+    @property
+    def generation(self):
+        # GCS bumps the generation on every overwrite; the mtime does the same job here
+        return os.stat(self.path).st_mtime_ns if self.exists() else None
+
+    @property
+    def md5_hash(self):
+        return None
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    def delete(self):
+        os.remove(self.path)
+        if os.path.isfile(self.metadata_path):
+            os.remove(self.metadata_path)
+
+    def download_as_bytes(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def download_to_filename(self, filename):
+        shutil.copyfile(self.path, filename)
+
+    def upload_from_filename(self, filename, content_type=None):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        shutil.copyfile(filename, tmp)
+        os.replace(tmp, self.path)
+        self._write_metadata()
+
+    def upload_from_string(self, data, content_type=None):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+        self._write_metadata()
+
+
+class LocalBucket:
+    """Filesystem stand-in for a google.cloud.storage Bucket rooted at a local directory.
+
+    Object names map to paths under root ('results/PDF/Race/x.pq' ->
+    root/results/PDF/Race/x.pq) so a bucket can be mirrored or faked on disk.
+    """
+
+    def __init__(self, root, name=None):
+        self.root = root
+        self.name = name or os.path.basename(os.path.abspath(root))
+
+    def blob(self, name, chunk_size=None):
+        return LocalBlob(self, name)
+
+    def list_blobs(self, prefix=''):
+        # only walk the directory the prefix points into
+        base = os.path.join(self.root, *prefix.split('/')[:-1])
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames[:] = sorted(d for d in dirnames if d != METADATA_DIR)
+            for filename in sorted(filenames):
+                if filename.endswith('.tmp'):
+                    continue
+                rel = os.path.relpath(os.path.join(dirpath, filename), self.root)
+                name = '/'.join(rel.split(os.sep))
+                if name.startswith(prefix):
+                    yield LocalBlob(self, name)
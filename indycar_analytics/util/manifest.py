@@ -0,0 +1,54 @@
+import json
+import os
+import time
+
+MANIFEST_CACHE_DIR = os.path.join('data', 'cache', 'manifests')
+
+
+class BlobManifest:
+    """Set of object names under a storage prefix, listed once.
+
+    Replaces an exists() round trip per file with one listing per run.
+    With ttl (seconds) the listing is also cached in MANIFEST_CACHE_DIR and reused
+    by later runs until it expires. Works with any util.storage backend.
+    """
+
+    def __init__(self, storage, prefix, ttl=None, cache_dir=MANIFEST_CACHE_DIR):
+        self.storage = storage
+        self.prefix = prefix
+        self.ttl = ttl
+        self.cache_path = None
+        if ttl:
+            safe_prefix = prefix.strip('/').replace('/', '_') or 'root'
+            self.cache_path = os.path.join(cache_dir, f'{storage.name}_{safe_prefix}.json')
+        self.names = self._load()
+
+    def _load(self):
+        if self.cache_path and os.path.exists(self.cache_path):
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if time.time() - cached['listed_at'] < self.ttl:
+                self.listed_at = cached['listed_at']
+                return set(cached['names'])
+
+        self.listed_at = time.time()
+        names = set(self.storage.list(self.prefix))
+        self._save(names)
+        return names
+
+    def _save(self, names):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp = f'{self.cache_path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'prefix': self.prefix, 'listed_at': self.listed_at, 'names': sorted(names)}, f)
+        os.replace(tmp, self.cache_path)
+
+    def exists(self, name):
+        return name in self.names
+
+    def add(self, name):
+        """Record an object this run just wrote."""
+        self.names.add(name)
+        self._save(self.names)
@@ -1,4 +1,14 @@
+import math
+from array import array
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import fitz
+import numpy as np
+import pandas as pd
+
+# bump whenever parse_file's columnar output changes so cached extractions are rebuilt
+SPANS_EXTRACT_VERSION = 1
 
 def get_page_fills(page_drawings):
     return [
@@ -10,7 +20,53 @@ def get_page_fills(page_drawings):
         if drawing['type'] == 'f' and drawing.get('fill')
     ]
 
+class FillIndex:
+    """Horizontal-band index over a page's filled rects (output of get_page_fills).
+
+    Each rect is bucketed into every band of band_height points it spans, so a span
+    only has to be tested against rects that share a band with it. Candidates are
+    tested in drawing order, so lookups return the same fill as a linear scan.
+    """
+
+    def __init__(self, filled_rects, band_height=8.0):
+        self.filled_rects = filled_rects
+        self.band_height = band_height
+        self.bands = defaultdict(list)
+
+        for i, fr in enumerate(filled_rects):
+            draw_rect = fr['rect']
+            # empty/infinite rects never intersect anything, so they can't match
+            if draw_rect.is_empty or draw_rect.is_infinite:
+                continue
+            for band in self._band_range(draw_rect.y0, draw_rect.y1):
+                self.bands[band].append(i)
+
+    def _band_range(self, y0, y1):
+        return range(math.floor(y0 / self.band_height), math.floor(y1 / self.band_height) + 1)
+
+    def find(self, bbox):
+        span_rect = fitz.Rect(bbox)
+        y0, y1 = span_rect.y0, span_rect.y1
+
+        bands = [self.bands[b] for b in self._band_range(y0, y1) if b in self.bands]
+        if not bands:
+            return None
+        candidates = bands[0] if len(bands) == 1 else sorted(set().union(*bands))
+
+        for i in candidates:
+            fr = self.filled_rects[i]
+            draw_rect = fr['rect']
+            if draw_rect.y1 >= y0 and draw_rect.y0 <= y1:
+                if draw_rect.intersects(span_rect):
+                    return fr['fill']
+
+        return None
+
 def find_fill(span, filled_rects):
+    # filled_rects is either a FillIndex or the raw list from get_page_fills
+    if isinstance(filled_rects, FillIndex):
+        return filled_rects.find(span["bbox"])
+
     span_rect = fitz.Rect(span["bbox"])
     y0, y1 = span_rect.y0, span_rect.y1
 
@@ -23,13 +79,113 @@ def find_fill(span, filled_rects):
 
     return None
 
-def parse_file(doc,fills=True):
+def pack_fill(fill):
+    """Pack an (r, g, b) fill into a single int, -1 when there is no fill."""
+    if not fill:
+        return -1
+    return (fill[0] << 16) | (fill[1] << 8) | fill[2]
+
+def unpack_fills(packed):
+    """Inverse of pack_fill for an array of packed fills -> (n, 3) array of r, g, b."""
+    packed = np.asarray(packed, dtype=np.int32)
+    return np.stack([(packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF], axis=1)
+
+class SpanColumns:
+    """Typed column buffers for parse_file(columnar=True)."""
+
+    def __init__(self):
+        self.text = []
+        self.page = array('h')
+        self.block = array('h')
+        self.line = array('h')
+        self.bbox = array('f')  # flat x0, y0, x1, y1 per span
+        self.fill = array('i')
+
+    def append(self, text, bbox, p, b, l, fill):
+        self.text.append(text)
+        self.page.append(p)
+        self.block.append(b)
+        self.line.append(l)
+        self.bbox.extend(bbox)
+        self.fill.append(pack_fill(fill))
+
+    def to_frame(self):
+        bbox = np.frombuffer(self.bbox, dtype=np.float32).reshape(-1, 4)
+        return pd.DataFrame({
+            'data': pd.array(self.text, dtype='string'),
+            'x0': bbox[:, 0],
+            'y0': bbox[:, 1],
+            'x1': bbox[:, 2],
+            'y1': bbox[:, 3],
+            'page': np.frombuffer(self.page, dtype=np.int16),
+            'block': np.frombuffer(self.block, dtype=np.int16),
+            'line': np.frombuffer(self.line, dtype=np.int16),
+            'fill': np.frombuffer(self.fill, dtype=np.int32),
+        })
+
+def rows_to_columnar(rows):
+    """Convert parse_file row dicts (or a DataFrame of them) to the columnar layout."""
+    cols = SpanColumns()
+    records = rows.to_dict('records') if isinstance(rows, pd.DataFrame) else rows
+    for row in records:
+        cols.append(row['data'], row['bbox'], row['page'], row['block'], row['line'], row.get('fill'))
+    return cols.to_frame()
+
+def iter_pages(df):
+    """Yield (page, frame) for every page of a parse_file DataFrame in a single pass.
+
+    parse_file emits rows page by page, so each page is a contiguous iloc slice
+    (a view, not a filtered copy). Frames that aren't grouped by page get one
+    stable sort first.
+    """
+    pages = df['page'].to_numpy()
+    if not len(pages):
+        return
+    if (pages[1:] < pages[:-1]).any():
+        df = df.sort_values('page', kind='stable')
+        pages = df['page'].to_numpy()
+
+    starts = np.flatnonzero(np.r_[True, pages[1:] != pages[:-1]])
+    ends = np.r_[starts[1:], len(pages)]
+    for start, end in zip(starts, ends):
+        yield pages[start], df.iloc[start:end]
+
+def page_chunks(page_count, workers):
+    """Split range(page_count) into contiguous chunks, a few per worker."""
+    n = max(1, min(page_count, workers * 4))
+    bounds = [round(i * page_count / n) for i in range(n + 1)]
+    return [range(bounds[i], bounds[i + 1]) for i in range(n)]
+
+def map_page_chunks(fn, doc, workers, *args):
+    """Run fn(path, pages, *args) over contiguous page chunks of doc in a process pool.
+
+    Each worker re-opens the document by path. Results come back in page order.
+    """
+    if not doc.name:
+        raise ValueError('Parallel page parsing needs a document opened from a file path')
+
+    chunks = page_chunks(doc.page_count, workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, repeat(doc.name), chunks, *(repeat(a) for a in args)))
+
+def _parse_pages(doc, pages, fills, columnar, page_filter=None):
     rows = []
-    for p,page in enumerate(doc):
+    cols = SpanColumns()
+    for p in pages:
         try:
+            page = doc[p]
+            want_fills = fills
+
+            # cheap plain-text pass decides whether the page is worth a full extraction
+            if page_filter is not None:
+                kind = page_filter(page.get_text('text'))
+                if kind is None:
+                    continue
+                want_fills = fills and kind == 'full'
+
             ptext = page.get_text('dict')
-            if fills:
-                pfills = get_page_fills(page.get_drawings())
+            if want_fills:
+                pfills = FillIndex(get_page_fills(page.get_drawings()))
             
             # get column headers
             #columns = get_column_headers(ptext['blocks'][0],None)
@@ -38,6 +194,11 @@ def parse_file(doc,fills=True):
                 if 'lines' in block.keys():
                     for l,line in enumerate(block['lines']):  
                         for span in line['spans']:
+                            if columnar:
+                                spanfill = find_fill(span,pfills) if want_fills else None
+                                cols.append(span['text'].strip(), span['bbox'], p, b, l, spanfill)
+                                continue
+
                             row = {
                                 #'column':find_column_for_span(span['bbox'], columns),
                                 'data':span['text'].strip(),
@@ -46,7 +207,7 @@ def parse_file(doc,fills=True):
                                 'block':b,
                                 'line':l,
                             }
-                            if fills:
+                            if want_fills:
                                 spanfill = find_fill(span,pfills)
                                 row['fill'] = spanfill
                                 
@@ -54,4 +215,40 @@ def parse_file(doc,fills=True):
         except Exception as e:
             print(f'Error parsing page {p}. Skipping for now. \n{e}')
 
-    return rows
\ No newline at end of file
+    return cols.to_frame() if columnar else rows
+
+def _parse_pages_from_path(path, pages, fills, columnar, page_filter):
+    with fitz.open(path) as doc:
+        return _parse_pages(doc, pages, fills, columnar, page_filter)
+
+def parse_file(doc,fills=True,columnar=False,workers=None,page_filter=None):
+    """Extract every text span in doc with its bbox and (optionally) its fill.
+
+    Returns a list of row dicts, or with columnar=True a DataFrame with typed
+    columns: data (string), x0/y0/x1/y1 (float32), page/block/line (int16) and
+    fill (int32 packed RGB, -1 for no fill).
+
+    With workers > 1 pages are parsed in a process pool (doc must have been
+    opened from a path); the output is identical to the serial path.
+
+    page_filter, if given, is called with each page's plain text and returns
+    'full' (spans and fills), 'spans' (spans only) or None (skip the page), so
+    pages that are thrown away downstream never pay for drawing extraction. It
+    must be a module-level function when workers > 1.
+    """
+    if not workers or workers < 2 or doc.page_count < 2:
+        return _parse_pages(doc, range(doc.page_count), fills, columnar, page_filter)
+
+    results = map_page_chunks(_parse_pages_from_path, doc, workers, fills, columnar, page_filter)
+    if columnar:
+        return pd.concat(results, ignore_index=True)
+    return [row for chunk in results for row in chunk]
+
+def parse_page(doc, page_number, fills=True):
+    """Columnar parse_file output for a single page."""
+    return _parse_pages(doc, [page_number], fills, columnar=True)
+
+def extract_spans(path, workers=None, page_filter=None):
+    """Columnar parse_file output for the PDF at path, in the form cached_extract expects."""
+    with fitz.open(path) as doc:
+        return {'spans': parse_file(doc, columnar=True, workers=workers, page_filter=page_filter)}
@@ -0,0 +1,135 @@
+"""Find outputs that are stale for the current parsers and source files, and rebuild only those.
+
+Every output carries a stamp (see util.stamps) with its source file's sha256 and the parser
+name and version that built it. An output is stale when it is missing, unstamped, its source
+changed, or its parser version differs from the entry point's PARSER_VERSION.
+
+Sources that parsed to no rows have no object, so their stamps are kept in
+data/cache/empty_outputs.json and they are only re-parsed once they are stale too.
+
+Dry run (the default) only lists the stale outputs and why. Options that change the
+output (PARSER_OPTIONS) are passed as flags, e.g. the results table engine:
+    python -m indycar_analytics.util.reprocess lapcharts
+    python -m indycar_analytics.util.reprocess lapcharts --run
+    python -m indycar_analytics.util.reprocess results --table-engine fitz --run
+"""
+import os
+import sys
+from .storage import get_storage
+from .stamps import SourceHashes, EmptyOutputs, make_stamp, stale_reason
+from .batch import run_batch
+from ..results import main as results_main
+from ..html_results import main as html_main
+from ..lap_charts import main as lap_main
+from ..section_results import main as section_main
+
+# report -> (source dir, extension, per-file parser, object path, parser name(**kwargs), parser version)
+REPORTS = {
+    'results': (
+        os.path.join('data', 'pdfs', 'results'), '.pdf', results_main.parse_results_file,
+        results_main.results_object_path, results_main.results_parser, results_main.PARSER_VERSION,
+    ),
+    'html_results': (
+        os.path.join('data', 'html', 'results'), '.html', html_main.parse_html_results_file,
+        html_main.html_results_object_path, lambda: 'html_results', html_main.PARSER_VERSION,
+    ),
+    'lapcharts': (
+        lap_main.LAPCHART_DIR, '.pdf', lap_main.parse_lap_chart_pdf,
+        lap_main.lap_chart_object_path, lambda: 'lapcharts', lap_main.PARSER_VERSION,
+    ),
+    'sectionresults': (
+        os.path.join('data', 'pdfs', 'sectionresults'), '.pdf', section_main.parse_section_results_file,
+        section_main.section_results_object_path, lambda: 'sectionresults', section_main.PARSER_VERSION,
+    ),
+}
+# options that change the output and therefore the parser name; the rest only change speed
+PARSER_OPTIONS = {'results': ('table_engine',)}
+
+
+def source_files(report):
+    source_dir, ext = REPORTS[report][:2]
+    files = sorted(f for f in os.listdir(source_dir) if f.endswith(ext))
+    if report == 'results':
+        files = [f for f in files if not any(bad in f for bad in results_main.SKIP_FILES)]
+    return files
+
+def parser_name(report, kwargs):
+    parser = REPORTS[report][4]
+    return parser(**{k: v for k, v in kwargs.items() if k in PARSER_OPTIONS.get(report, ())})
+
+def plan_stale(report, files='all', storage=None, **kwargs):
+    """[(file, reason)] for every output of report that has to be rebuilt, in file order.
+
+    Object stamps come from one listing of the output prefix; source hashes are cached
+    in data/cache by size and mtime, so repeat plans only re-hash changed files.
+    """
+    source_dir, _, _, object_path, _, version = REPORTS[report]
+    storage = storage or get_storage()
+    if files == 'all':
+        files = source_files(report)
+
+    parser = parser_name(report, kwargs)
+    names = {file: object_path(file) for file in files}
+    prefixes = {name.rsplit('/', 1)[0] + '/' for name in names.values()}
+    stamps = {}
+    for prefix in prefixes:
+        stamps.update(storage.list_metadata(prefix))
+
+    hashes = SourceHashes()
+    empties = EmptyOutputs()
+    stale = []
+    for file in files:
+        name = names[file]
+        stamp = stamps.get(name) if name in stamps else empties.get(report, file)
+        if stamp is None:
+            stale.append((file, 'missing'))
+            continue
+        expected = make_stamp(hashes.get(os.path.join(source_dir, file)), parser, version)
+        reason = stale_reason(stamp, expected)
+        if reason:
+            stale.append((file, reason))
+    hashes.save()
+    return stale
+
+def reprocess(report, files='all', dry_run=True, storage=None, workers=None, chunksize=1, upload_workers=4, **kwargs):
+    """Rebuild the stale outputs of report; kwargs go to its per-file parser (e.g. table_engine).
+
+    With dry_run only the plan is printed and returned.
+    """
+    storage = storage or get_storage()
+    stale = plan_stale(report, files, storage, **kwargs)
+    for file, reason in stale:
+        print(f"{file}: {reason}")
+    print(f"{len(stale)} {report} outputs to rebuild")
+    if dry_run or not stale:
+        return stale
+
+    source_dir, _, parse, _, _, version = REPORTS[report]
+    summary = run_batch(parse, [file for file, _ in stale], storage, workers=workers, chunksize=chunksize,
+                        upload_workers=upload_workers, **kwargs)
+
+    # no object carries these stamps, so remember them for the next plan
+    hashes, empties = SourceHashes(), EmptyOutputs()
+    for file in summary.empty:
+        empties.add(report, file, make_stamp(hashes.get(os.path.join(source_dir, file)), parser_name(report, kwargs), version))
+    empties.save()
+    hashes.save()
+    summary.report()
+    return summary
+
+
+def parse_options(report, argv):
+    """--table-engine fitz / --table-engine=fitz style flags for the PARSER_OPTIONS of report."""
+    options = {}
+    for option in PARSER_OPTIONS.get(report, ()):
+        flag = '--' + option.replace('_', '-')
+        for i, arg in enumerate(argv):
+            if arg.startswith(flag + '='):
+                options[option] = arg.split('=', 1)[1]
+            elif arg == flag and i + 1 < len(argv):
+                options[option] = argv[i + 1]
+    return options
+
+
+if __name__ == '__main__':
+    reprocess(sys.argv[1], dry_run='--run' not in sys.argv, **parse_options(sys.argv[1], sys.argv[2:]))
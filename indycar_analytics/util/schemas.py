@@ -0,0 +1,177 @@
+"""Arrow schemas the parsed outputs are written with.
+
+Every report type lists its known columns with a kind:
+  'category' - dictionary-encoded string (car numbers, drivers, sections, flags, file names)
+  'color'    - (r, g, b) fill tuple or "r,g,b" string, stored as a dictionary-encoded '#rrggbb' string
+  'int16' / 'int32' / 'float64' / 'string' - plain typed columns
+Registered columns are always written in this order, as nulls when a file lacks them.
+Any other column follows as int32 if it holds only whole numbers, float64 if otherwise
+numeric, else string. Reports marked closed
+never have other columns, so concat can use their schema without reading any footers.
+"""
+import io
+
+SCHEMAS = {
+    'sectionresults': [
+        ('Car', 'category'),
+        ('Driver', 'category'),
+        ('Lap', 'int16'),
+        ('Section', 'category'),
+        ('Flag', 'category'),
+        ('Time', 'float64'),
+        ('Speed', 'float64'),
+    ],
+    'lapcharts': [
+        ('Position', 'int16'),
+        ('Car', 'category'),
+        ('Color', 'color'),
+        ('lap', 'int16'),
+        ('lap_fill', 'color'),
+        ('file', 'category'),
+    ],
+    'results': [
+        ('Pos', 'int16'),
+        ('SP', 'int16'),
+        ('Car', 'category'),
+        ('Driver', 'category'),
+        ('C/A/E/T', 'category'),
+        ('Laps', 'int16'),
+        ('Lap', 'int16'),
+        ('Laps Down', 'int16'),
+        ('Pit Stops', 'int16'),
+        ('Pts', 'int16'),
+        ('Total Pts', 'int16'),
+        ('Standings', 'int16'),
+        ('Rank', 'int16'),
+        ('Total Laps', 'int16'),
+        ('Running / Reason Out', 'category'),
+        ('file', 'category'),
+    ],
+    'html_results': [
+        ('No.', 'category'),
+        ('Driver', 'category'),
+        ('file', 'category'),
+    ],
+}
+
+CLOSED = ('sectionresults', 'lapcharts')
+
+
+def arrow_type(kind):
+    import pyarrow as pa
+
+    if kind in ('category', 'color'):
+        return pa.dictionary(pa.int32(), pa.string())
+    return {'int16': pa.int16(), 'int32': pa.int32(), 'float64': pa.float64(), 'string': pa.string()}[kind]
+
+def registered_schema(report, extras=None):
+    """Arrow schema of the registered columns of report, followed by any fields of extras not registered."""
+    import pyarrow as pa
+
+    registered = SCHEMAS[report]
+    # color columns are tagged so conform_table can normalise older outputs' fill values
+    fields = [pa.field(name, arrow_type(kind), metadata={'kind': 'color'} if kind == 'color' else None)
+              for name, kind in registered]
+    names = {name for name, _ in registered}
+    if extras is not None:
+        fields += [f for f in extras if f.name not in names]
+    return pa.schema(fields)
+
+def format_color(fill):
+    """(r, g, b), [r, g, b] or "r,g,b" (lap_charts find_fill) -> '#rrggbb'; '#rrggbb' is kept, anything else is None."""
+    if isinstance(fill, str):
+        if fill.startswith('#') and len(fill) == 7:
+            return fill.lower()
+        fill = fill.split(',')
+    if hasattr(fill, '__len__') and len(fill) == 3:
+        try:
+            return '#%02x%02x%02x' % tuple(int(c) for c in fill)
+        except (TypeError, ValueError):
+            return None
+    return None
+
+def to_arrow(values, kind):
+    """pandas Series -> Arrow array of the given kind."""
+    import pandas as pd
+    import pyarrow as pa
+
+    if kind == 'color':
+        return pa.array(values.astype(object).map(format_color), pa.string()).dictionary_encode()
+    if kind == 'category':
+        return pa.array(values.astype('string'), pa.string()).dictionary_encode()
+    if kind == 'int16':
+        return pa.array(pd.to_numeric(values, errors='coerce').astype('Int16'), pa.int16())
+    if kind == 'int32':
+        return pa.array(pd.to_numeric(values, errors='coerce').astype('Int32'), pa.int32())
+    if kind == 'float64':
+        return pa.array(pd.to_numeric(values, errors='coerce').astype('float64'), pa.float64())
+    return pa.array(values.astype('string'), pa.string())
+
+def is_color(field):
+    return bool(field.metadata) and field.metadata.get(b'kind') == b'color'
+
+def as_category(column, color=False):
+    """Arrow column from an older output (plain strings or fill lists) -> dictionary-encoded strings.
+
+    With color, fill values in any format format_color accepts become '#rrggbb'.
+    """
+    import pyarrow as pa
+
+    if color or pa.types.is_list(column.type) or pa.types.is_large_list(column.type):
+        return pa.chunked_array([to_arrow(column.to_pandas(), 'color')])
+    return column.cast(pa.string()).dictionary_encode()
+
+def numeric_kind(values):
+    """Kind an unregistered column is written as.
+
+    Whole numbers stay integers even when NaN made pandas hold them as floats
+    (pd.to_numeric(downcast='integer') leaves a column with blanks as float64).
+    """
+    import pandas as pd
+
+    if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        return 'string'
+    present = values.dropna()
+    if pd.api.types.is_float_dtype(values) and (present.empty or (present % 1 != 0).any()):
+        return 'float64'
+    if not present.empty and present.abs().max() >= 2 ** 31:
+        return 'float64'
+    return 'int32'
+
+def to_table(df, report):
+    """DataFrame -> Arrow table with the registered schema of report enforced."""
+    import pandas as pd
+    import pyarrow as pa
+
+    registered = SCHEMAS[report]
+    names, arrays = [], []
+    for name, kind in registered:
+        values = df[name] if name in df.columns else pd.Series([None] * len(df), dtype=object)
+        names.append(name)
+        arrays.append(to_arrow(values.reset_index(drop=True), kind))
+
+    known = {name for name, _ in registered}
+    for name in df.columns:
+        if name in known:
+            continue
+        values = df[name].reset_index(drop=True)
+        if report in CLOSED:
+            raise ValueError(f"Unexpected column {name!r} in {report} output")
+        kind = numeric_kind(values)
+        names.append(str(name))
+        arrays.append(to_arrow(values, kind))
+    return pa.Table.from_arrays(arrays, names=names)
+
+def to_parquet_bytes(df, report, metadata=None):
+    """df.to_parquet(index=False) with the registered schema of report enforced.
+
+    metadata (str -> str, e.g. a util.stamps stamp) is added to the file's key-value metadata.
+    """
+    import pyarrow.parquet as pq
+
+    table = to_table(df, report)
+    if metadata:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+    buf = io.BytesIO()
+    pq.write_table(table, buf)
+    return buf.getvalue()
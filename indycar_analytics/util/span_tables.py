@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+from .pdf_utils import parse_page
+
+
+def merge_line_spans(dfs, gap_ratio=0.4):
+    """Merge neighbouring spans on the same text line into phrases.
+
+    Spans separated by less than gap_ratio * span height are treated as words of
+    the same cell (e.g. 'Driver' 'Name'); anything wider is a column gap.
+    """
+    dfs = dfs.sort_values(['block', 'line', 'x0'], kind='stable')
+    height = (dfs.y1 - dfs.y0).to_numpy()
+    x0, x1 = dfs.x0.to_numpy(), dfs.x1.to_numpy()
+    same_line = ((dfs.block.to_numpy()[1:] == dfs.block.to_numpy()[:-1])
+                 & (dfs.line.to_numpy()[1:] == dfs.line.to_numpy()[:-1]))
+    close = (x0[1:] - x1[:-1]) < gap_ratio * np.maximum(height[1:], height[:-1])
+    phrase = np.r_[0, np.cumsum(~(same_line & close))]
+
+    return (dfs.assign(phrase=phrase)
+            .groupby('phrase', sort=True)
+            .agg(data=('data', ' '.join), x0=('x0', 'min'), y0=('y0', 'min'),
+                 x1=('x1', 'max'), y1=('y1', 'max'))
+            .reset_index(drop=True))
+
+
+def cluster_rows(phrases, tol_ratio=0.5):
+    """Row id for every phrase, grouping phrases whose vertical centers are within tolerance."""
+    center = ((phrases.y0 + phrases.y1) / 2).to_numpy()
+    tol = tol_ratio * np.median((phrases.y1 - phrases.y0).to_numpy())
+    order = np.argsort(center, kind='stable')
+
+    rows = np.empty(len(center), dtype=int)
+    row, row_start = 0, None
+    for i in order:
+        if row_start is not None and center[i] - row_start > tol:
+            row += 1
+            row_start = None
+        if row_start is None:
+            row_start = center[i]
+        rows[i] = row
+    return rows
+
+
+def find_columns(phrases):
+    """Column x-intervals from the rows with the typical (modal) number of cells.
+
+    Title and footer lines span several columns, so only rows with at least the
+    modal cell count take part; their overlapping x-ranges are merged into columns.
+    """
+    counts = phrases.groupby('row').size()
+    multi = counts[counts > 1]
+    mode = multi.mode().max() if len(multi) else 1
+    table_rows = counts.index[counts >= mode]
+
+    spans = phrases.loc[phrases.row.isin(table_rows), ['x0', 'x1']].sort_values('x0').to_numpy()
+    columns = []
+    for x0, x1 in spans:
+        if columns and x0 <= columns[-1][1]:
+            columns[-1][1] = max(columns[-1][1], x1)
+        else:
+            columns.append([x0, x1])
+    return np.array(columns)
+
+
+def assign_columns(phrases, columns):
+    """Column index for every phrase: largest x overlap, else the nearest column center."""
+    x0 = phrases.x0.to_numpy()[:, None]
+    x1 = phrases.x1.to_numpy()[:, None]
+    overlap = np.minimum(x1, columns[:, 1]) - np.maximum(x0, columns[:, 0])
+    nearest = np.abs((x0 + x1) / 2 - columns.mean(axis=1)).argmin(axis=1)
+    return np.where(overlap.max(axis=1) > 0, overlap.argmax(axis=1), nearest)
+
+
+def spans_to_table(dfs):
+    """Lay the spans of one page out as a grid of strings.
+
+    Returns a DataFrame shaped like camelot's stream-mode Table.df: integer row and
+    column labels, one string per cell and '' for empty cells.
+    """
+    dfs = dfs.loc[dfs.data.astype(object).str.len() > 0]
+    if dfs.empty:
+        return pd.DataFrame()
+
+    phrases = merge_line_spans(dfs)
+    phrases['row'] = cluster_rows(phrases)
+    columns = find_columns(phrases)
+    phrases['col'] = assign_columns(phrases, columns)
+
+    cells = (phrases.sort_values(['row', 'col', 'x0'])
+             .groupby(['row', 'col'])['data'].agg(' '.join))
+    table = cells.unstack('col').reindex(columns=range(len(columns))).fillna('')
+    table.index = range(len(table))
+    table.columns = range(len(columns))
+    return table
+
+
+def extract_page_table(doc, page_number=0):
+    """spans_to_table for one page of an open fitz document."""
+    dfs = parse_page(doc, page_number, fills=False)
+    return spans_to_table(dfs)
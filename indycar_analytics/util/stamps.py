@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+
+# sha256 of source files keyed by path, reused while their size and mtime are unchanged
+HASH_CACHE_PATH = os.path.join('data', 'cache', 'source_hashes.json')
+# stamps of sources whose parser found no rows, keyed by report and file
+EMPTY_CACHE_PATH = os.path.join('data', 'cache', 'empty_outputs.json')
+
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class SourceHashes:
+    """Content hashes of source files, cached on disk so planning doesn't re-read every PDF."""
+
+    def __init__(self, path=HASH_CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def get(self, source_path):
+        st = os.stat(source_path)
+        key = os.path.abspath(source_path)
+        entry = self.entries.get(key)
+        if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            return entry['sha256']
+        sha = file_hash(source_path)
+        self.entries[key] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': sha}
+        self.dirty = True
+        return sha
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+class EmptyOutputs:
+    """Stamps of sources that parsed to no rows.
+
+    Those never get an object to carry their stamp, so without this the planner would
+    report them missing and re-parse them on every run.
+    """
+
+    def __init__(self, path=EMPTY_CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def get(self, report, file):
+        return self.entries.get(report, {}).get(file)
+
+    def add(self, report, file, stamp):
+        self.entries.setdefault(report, {})[file] = stamp
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+def make_stamp(source_sha256, parser, parser_version):
+    """Object/Parquet metadata recording what an output was built from."""
+    return {
+        'source_sha256': source_sha256,
+        'parser': parser,
+        'parser_version': str(parser_version),
+    }
+
+def source_stamp(source_path, parser, parser_version):
+    return make_stamp(file_hash(source_path), parser, parser_version)
+
+def stale_reason(stamp, expected):
+    """Why an output with stamp needs rebuilding to match expected, None if it is current."""
+    if not stamp or 'parser_version' not in stamp:
+        return 'unstamped'
+    if stamp.get('source_sha256') != expected['source_sha256']:
+        return 'source changed'
+    if (stamp.get('parser'), stamp.get('parser_version')) != (expected['parser'], expected['parser_version']):
+        return f"parser {stamp.get('parser')} v{stamp.get('parser_version')} -> {expected['parser']} v{expected['parser_version']}"
+    return None
@@ -0,0 +1,167 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+from .local_bucket import LocalBucket
+
+DEFAULT_BUCKET = "motorstats-clean-pq"
+DEFAULT_LOCAL_ROOT = os.path.join('data', 'bucket')
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # must be a multiple of 256 KB for GCS
+
+
+class Storage(ABC):
+    """exists/list/read/write over a bucket-like object (GCS Bucket or LocalBucket).
+
+    Backends implement bucket, uri and arrow_path; a backend missing one can't be constructed.
+    """
+
+    name = None
+
+    @property
+    @abstractmethod
+    def bucket(self):
+        """The GCS Bucket or LocalBucket the other methods work on."""
+
+    def exists(self, name):
+        return self.bucket.blob(name).exists()
+
+    def list(self, prefix=''):
+        return [b.name for b in self.bucket.list_blobs(prefix=prefix)]
+
+    def list_versions(self, prefix=''):
+        """{name: {'generation', 'md5'}} for every object under prefix, from a single listing."""
+        return {b.name: {'generation': b.generation, 'md5': b.md5_hash}
+                for b in self.bucket.list_blobs(prefix=prefix)}
+
+    def list_metadata(self, prefix=''):
+        """{name: custom metadata dict} for every object under prefix, from a single listing."""
+        return {b.name: b.metadata or {} for b in self.bucket.list_blobs(prefix=prefix)}
+
+    def read(self, name):
+        return self.bucket.blob(name).download_as_bytes()
+
+    def write(self, name, data, content_type="application/octet-stream", metadata=None):
+        blob = self.bucket.blob(name)
+        if metadata:
+            blob.metadata = metadata
+        blob.upload_from_string(data=data, content_type=content_type)
+
+    def read_to_file(self, name, path):
+        self.bucket.blob(name).download_to_filename(path)
+
+    def write_file(self, name, path, content_type="application/octet-stream", metadata=None):
+        """Upload a local file. Setting a chunk size makes GCS use a resumable upload."""
+        blob = self.bucket.blob(name, chunk_size=UPLOAD_CHUNK_SIZE)
+        if metadata:
+            blob.metadata = metadata
+        blob.upload_from_filename(path, content_type=content_type)
+
+    def delete(self, name):
+        self.bucket.blob(name).delete()
+
+    @abstractmethod
+    def uri(self, name):
+        """Printable location of name, e.g. gs://bucket/name."""
+
+    @abstractmethod
+    def arrow_path(self, name):
+        """(pyarrow filesystem, path) for reading name directly with pyarrow."""
+
+
+class GCSStorage(Storage):
+    """Google Cloud Storage bucket. The client (and credentials) are only loaded on first use."""
+
+    def __init__(self, bucket_name=DEFAULT_BUCKET, credentials_path=None):
+        self.name = bucket_name
+        self.credentials_path = credentials_path or os.getenv(
+            "GOOGLE_APPLICATION_CREDENTIALS",
+            os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "dbt-service-account-credentials.json"))
+        )
+        self._bucket = None
+        self._arrow_fs = None  # (GcsFileSystem, token expiry)
+        self._lock = threading.Lock()
+
+    @property
+    def bucket(self):
+        # uploads run on worker threads, so only let one of them build the client
+        with self._lock:
+            if self._bucket is None:
+                from google.cloud import storage
+                from google.oauth2 import service_account
+                credentials = service_account.Credentials.from_service_account_file(self.credentials_path)
+                client = storage.Client(credentials=credentials, project=credentials.project_id)
+                self._bucket = client.bucket(self.name)
+        return self._bucket
+
+    def __getstate__(self):
+        # sent to worker processes without the client, which each worker builds for itself
+        state = self.__dict__.copy()
+        state['_bucket'] = None
+        state['_arrow_fs'] = None
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def uri(self, name):
+        return f"gs://{self.name}/{name}"
+
+    def arrow_path(self, name):
+        # pyarrow's GCS filesystem takes an OAuth token, not a key file, so mint one from
+        # this storage's service account instead of touching the process environment.
+        # The filesystem is reused until its token is within 5 minutes of expiring.
+        from datetime import datetime, timedelta, timezone
+        from pyarrow import fs
+        with self._lock:
+            if self._arrow_fs is None or self._arrow_fs[1] - datetime.now(timezone.utc) < timedelta(minutes=5):
+                from google.auth.transport.requests import Request
+                from google.oauth2 import service_account
+                credentials = service_account.Credentials.from_service_account_file(
+                    self.credentials_path, scopes=["https://www.googleapis.com/auth/devstorage.read_write"])
+                credentials.refresh(Request())
+                expiry = credentials.expiry.replace(tzinfo=timezone.utc)
+                filesystem = fs.GcsFileSystem(access_token=credentials.token, credential_token_expiration=expiry,
+                                              project_id=credentials.project_id)
+                self._arrow_fs = (filesystem, expiry)
+            filesystem = self._arrow_fs[0]
+        return filesystem, f"{self.name}/{name}"
+
+
+class LocalStorage(Storage):
+    """Local directory laid out like the bucket, for offline runs and benchmarks."""
+
+    def __init__(self, root=DEFAULT_LOCAL_ROOT):
+        self.root = root
+        self._bucket = LocalBucket(root)
+        self.name = self._bucket.name
+
+    @property
+    def bucket(self):
+        return self._bucket
+
+    def uri(self, name):
+        return os.path.join(self.root, *name.split('/'))
+
+    def arrow_path(self, name):
+        from pyarrow import fs
+        return fs.LocalFileSystem(), os.path.abspath(self.uri(name))
+
+
+_storages = {}
+
+def get_storage(backend=None):
+    """Storage backend picked by MOTORSTATS_STORAGE ('gcs', the default, or 'local').
+
+    MOTORSTATS_BUCKET overrides the GCS bucket name and MOTORSTATS_LOCAL_ROOT the local
+    directory. Instances are shared per backend so the GCS client is only built once.
+    """
+    backend = (backend or os.getenv('MOTORSTATS_STORAGE', 'gcs')).lower()
+    if backend not in _storages:
+        if backend == 'gcs':
+            _storages[backend] = GCSStorage(os.getenv('MOTORSTATS_BUCKET', DEFAULT_BUCKET))
+        elif backend == 'local':
+            _storages[backend] = LocalStorage(os.getenv('MOTORSTATS_LOCAL_ROOT', DEFAULT_LOCAL_ROOT))
+        else:
+            raise ValueError(f"Unknown storage backend {backend}. Use 'gcs' or 'local'.")
+    return _storages[backend]
@@ -0,0 +1,71 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+def upload_with_retry(storage, name, data, content_type="application/octet-stream", metadata=None, retries=3, backoff=1.0):
+    """storage.write, retried with exponential backoff; the last error is raised."""
+    for attempt in range(retries + 1):
+        try:
+            storage.write(name, data, content_type=content_type, metadata=metadata)
+            return
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+class BackgroundUploader:
+    """Bounded thread pool for storage writes so parsing doesn't wait on the network.
+
+    submit() blocks once max_pending uploads are outstanding, which caps the parquet
+    bytes held in memory. Failed uploads are retried with exponential backoff.
+    flush() waits for everything queued so far and reports what succeeded and failed.
+    """
+
+    def __init__(self, max_workers=4, max_pending=16, retries=3, backoff=1.0):
+        self.retries = retries
+        self.backoff = backoff
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='upload')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = []
+
+    def _upload(self, storage, name, data, content_type, metadata):
+        upload_with_retry(storage, name, data, content_type, metadata, self.retries, self.backoff)
+
+    def submit(self, storage, name, data, key=None, content_type="application/octet-stream", metadata=None):
+        """Queue a write of data to name. key (e.g. the source file) is echoed back by flush()."""
+        self._slots.acquire()
+        try:
+            future = self._pool.submit(self._upload, storage, name, data, content_type, metadata)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        self._pending.append((key, name, future))
+
+    def flush(self):
+        """Wait for all queued uploads.
+
+        Returns (uploaded, failed): uploaded is [(key, object name)], failed is
+        [(key, object name, error)], both in submission order.
+        """
+        wait([f for _, _, f in self._pending])
+        uploaded, failed = [], []
+        for key, name, future in self._pending:
+            error = future.exception()
+            if error is None:
+                uploaded.append((key, name))
+            else:
+                failed.append((key, name, error))
+        self._pending = []
+        return uploaded, failed
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()